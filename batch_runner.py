@@ -0,0 +1,133 @@
+"""Run the FEMSA download flow for many clients in a single process"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
+
+from browser_pool import BrowserPool
+from database_connector import DatabaseConnector
+from main import run_client, OUTCOME_SUCCESS, OUTCOME_ALREADY_DONE
+from spans import SpanRecorder, activate
+from trace_export import write_run_trace
+import settings
+
+
+class BatchRunner:
+    def __init__(self, workers: int = settings.BATCH_WORKERS, cadena: str = 'cruz verde', use_pool: bool = True):
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        self.workers = workers
+        self.cadena = cadena
+        self.pool = BrowserPool(workers) if use_pool else None
+        # One pooled connector shared by every worker
+        self.db = DatabaseConnector(**settings.DB_CONFIG, pool_size=workers)
+        self.results: List[Dict[str, Any]] = []
+        self.spans: List[Dict[str, Any]] = []
+        self._spans_lock = threading.Lock()
+        self.preflight = True
+
+    def load_clients(self) -> List[str]:
+        """Read the clients of the chain that still need a run today"""
+        pending = self.db.get_pending_clients(self.cadena)
+        if pending is None:
+            raise RuntimeError("Could not load pending clients")
+        print(f"Preflight: {len(pending)} clients pending for today")
+        return pending
+
+    def run_one(self, cliente: str) -> Dict[str, Any]:
+        """Run a single client and capture its outcome and duration"""
+        started = time.time()
+        print(f"[{threading.current_thread().name}] Starting client {cliente}")
+        spans = SpanRecorder.for_run(cliente)
+        activate(spans)
+        try:
+            with spans.span('client') as client_span:
+                # Skip finished clients before borrowing a browser
+                if self.preflight and self.db.check_last_log_status(cliente):
+                    outcome = OUTCOME_ALREADY_DONE
+                elif self.pool:
+                    with spans.span('browser.acquire'):
+                        driver = self.pool.acquire()
+                    try:
+                        outcome = run_client(cliente, self.db, driver, preflight=False, spans=spans)
+                    finally:
+                        with spans.span('browser.release'):
+                            self.pool.release(driver)
+                else:
+                    outcome = run_client(cliente, self.db, preflight=False, spans=spans)
+                client_span['outcome_detail'] = outcome
+            error = None
+        except Exception as e:
+            outcome = 'failed'
+            error = str(e)
+        finally:
+            activate(None)
+            spans.close()
+            write_run_trace(spans.spans, cliente)
+            with self._spans_lock:
+                self.spans.extend(spans.spans)
+        duration = time.time() - started
+        print(f"[{threading.current_thread().name}] Finished client {cliente}: {outcome} in {duration:.1f}s")
+        return {
+            'cliente': cliente,
+            'outcome': outcome,
+            'duration': duration,
+            'error': error,
+        }
+
+    def run(self, clients: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Run all clients across the worker pool and return per-client results"""
+        # Explicitly listed clients still get the per-client preflight
+        self.preflight = clients is not None
+        if clients is None:
+            clients = self.load_clients()
+        print(f"Running {len(clients)} clients with {self.workers} workers")
+
+        self.results = []
+        self.spans = []
+        try:
+            if self.pool and clients:
+                self.pool.start(len(clients))
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='femsa-worker') as executor:
+                futures = {executor.submit(self.run_one, cliente): cliente for cliente in clients}
+                for future in as_completed(futures):
+                    self.results.append(future.result())
+        finally:
+            if self.pool:
+                self.pool.close()
+        # One timeline for the whole batch, a track per worker
+        write_run_trace(self.spans, 'batch')
+        return self.results
+
+    def print_summary(self, elapsed: float):
+        """Print per-client outcomes and the total wall-clock time"""
+        print("\nBatch summary")
+        print("-" * 60)
+        for result in sorted(self.results, key=lambda r: r['cliente']):
+            line = f"{result['cliente']:<30} {result['outcome']:<14} {result['duration']:>8.1f}s"
+            if result['error']:
+                line += f"  ({result['error']})"
+            print(line)
+        print("-" * 60)
+        succeeded = sum(1 for r in self.results if r['outcome'] in (OUTCOME_SUCCESS, OUTCOME_ALREADY_DONE))
+        print(f"{succeeded}/{len(self.results)} clients ok, total wall-clock {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run FEMSA report downloads for many clients")
+    parser.add_argument('clientes', nargs='*', help="Clients to run (default: all clients of the chain)")
+    parser.add_argument('--workers', type=int, default=settings.BATCH_WORKERS,
+                        help="Number of concurrent browser workers")
+    parser.add_argument('--cold-browsers', action='store_true',
+                        help="Launch a fresh Chrome per client instead of reusing pooled sessions")
+    args = parser.parse_args()
+
+    runner = BatchRunner(workers=args.workers, use_pool=not args.cold_browsers)
+    started = time.time()
+    runner.run(args.clientes or None)
+    runner.print_summary(time.time() - started)
+
+
+if __name__ == "__main__":
+    main()
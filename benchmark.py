@@ -0,0 +1,242 @@
+"""End-to-end benchmark of the automation flow against the local mock portal"""
+import argparse
+import itertools
+import json
+import math
+import os
+import resource
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from main import FEMSAAutomation
+from mock_portal import MockPortal
+from spans import SpanRecorder
+import settings
+
+
+class BenchmarkDatabase:
+    """In-memory stand-in for DatabaseConnector serving synthetic clients"""
+    def __init__(self, units: int):
+        self.units = units
+        self._run_ids = itertools.count(1)
+
+    def get_client_info(self, cliente: str, cadena: str = 'cruz verde') -> Dict[str, Any]:
+        return {
+            'id': abs(hash(cliente)) % 100000,
+            'cliente': cliente,
+            'Nombre': cliente,
+            'user': f"{cliente}-user",
+            'password': 'secret',
+            'unidad_negocio': self.units,
+        }
+
+    def get_client_units(self, cliente_id: int) -> List[Dict[str, Any]]:
+        return [
+            {'unidad_negocio_id': self.units - i, 'archivo_venta': f"venta_u{self.units - i}_",
+             'archivo_inventario': f"inventario_u{self.units - i}_"}
+            for i in range(self.units)
+        ]
+
+    def check_report_status(self, date: str, cliente: str, cadena: str = 'cruz verde') -> bool:
+        return False
+
+    def check_last_log_status(self, cliente: str, cadena: str = 'cruz verde') -> Optional[Dict[str, Any]]:
+        return None
+
+    def log_report_generation(self, cliente: str, cadena: str, status: int = 0,
+                              fecha: Optional[str] = None) -> Optional[int]:
+        return next(self._run_ids)
+
+    def update_report_status(self, cliente: str, cadena: str, status: int = 1,
+                             run_id: Optional[int] = None) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'max': max(values),
+    }
+
+
+def process_tree_rss(root_pid: int, include_root: bool = True) -> int:
+    """Resident memory in bytes of a process and all its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, the ppid follows the closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    pending = [root_pid] if include_root else list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler:
+    """
+    Track in the background the peak RSS of every process below `root_pid`,
+    i.e. all chromedriver/Chrome trees a run starts, sibling sessions included
+    """
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(self.root_pid, include_root=False))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+class Benchmark:
+    def __init__(self, clients: int = 1, units: int = 1, repeat: int = 3,
+                 latency: float = 0.0, generate_delay: float = 0.5, rows: int = 1000):
+        self.clients = [f"bench-{i + 1}" for i in range(clients)]
+        self.units = units
+        self.repeat = repeat
+        self.portal = MockPortal(units=units, latency=latency, generate_delay=generate_delay, rows=rows)
+        self.db = BenchmarkDatabase(units)
+        self.step_durations: Dict[str, List[float]] = {}
+        self.run_durations: List[float] = []
+        self.failures: List[Dict[str, Any]] = []
+        self.chrome_peak_rss = 0
+        self.command_counts: Dict[str, List[int]] = {}
+        self.command_summaries: List[Dict[str, Any]] = []
+
+    def run_client(self, cliente: str):
+        """Run login -> generate_reports -> logout for one synthetic client"""
+        spans = SpanRecorder(None, client=cliente)
+        # Sample every browser this process starts, so sibling sessions count too
+        with RssSampler(os.getpid()) as sampler:
+            automation = FEMSAAutomation(cliente, self.db, spans=spans, base_url=self.portal.base_url)
+            started = time.time()
+            try:
+                automation.login()
+                automation.generate_reports()
+                self.run_durations.append(time.time() - started)
+            except Exception as e:
+                self.failures.append({'cliente': cliente, 'error': str(e)})
+                print(f"Benchmark run for {cliente} failed: {str(e)}")
+            finally:
+                automation.close()
+        self.chrome_peak_rss = max(self.chrome_peak_rss, sampler.peak)
+        for span in spans.spans:
+            self.step_durations.setdefault(span['name'], []).append(span['duration'])
+        command_summary = automation.command_metrics.summary()
+        self.command_summaries.append({'cliente': cliente, **command_summary})
+        for step, stats in command_summary['steps'].items():
+            self.command_counts.setdefault(step, []).append(stats['commands'])
+
+    def run(self) -> Dict[str, Any]:
+        with self.portal, tempfile.TemporaryDirectory(prefix='femsa-bench-') as data_dir:
+            settings.DATA_DIR = data_dir
+            for repetition in range(self.repeat):
+                print(f"Repetition {repetition + 1}/{self.repeat}")
+                for cliente in self.clients:
+                    self.run_client(cliente)
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'config': {
+                'clients': len(self.clients),
+                'units': self.units,
+                'repeat': self.repeat,
+                'latency': self.portal.latency,
+                'generate_delay': self.portal.generate_delay,
+                'rows': self.portal.rows,
+                'wait_mode': settings.WAIT_MODE,
+                'download_mode': settings.DOWNLOAD_MODE,
+                'parallel_pipelines': settings.PARALLEL_PIPELINES,
+                'unit_concurrency': settings.UNIT_CONCURRENCY,
+            },
+            'run': summarize(self.run_durations) if self.run_durations else None,
+            'steps': {name: summarize(values) for name, values in sorted(self.step_durations.items())},
+            'webdriver_commands': {step: summarize(counts) for step, counts in sorted(self.command_counts.items())},
+            # Per-run command latencies and histograms, per command and per step
+            'webdriver_command_runs': self.command_summaries,
+            'failures': self.failures,
+            # ru_maxrss is reported in kilobytes on Linux
+            'python_peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            'chrome_peak_rss_bytes': self.chrome_peak_rss,
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'step':<45} {'n':>5} {'p50':>9} {'p95':>9} {'max':>9}")
+    print("-" * 81)
+    rows = list(report['steps'].items())
+    if report['run']:
+        rows.append(('TOTAL RUN', report['run']))
+    for name, stats in rows:
+        print(f"{name:<45} {stats['count']:>5} {stats['p50']:>8.2f}s {stats['p95']:>8.2f}s {stats['max']:>8.2f}s")
+    print("-" * 81)
+    print(f"Peak RSS: python {report['python_peak_rss_bytes'] / 2**20:.1f} MiB, "
+          f"chrome {report['chrome_peak_rss_bytes'] / 2**20:.1f} MiB")
+    if report['failures']:
+        print(f"{len(report['failures'])} failed runs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full flow against the local mock portal")
+    parser.add_argument('--clients', type=int, default=1, help="Synthetic clients per repetition")
+    parser.add_argument('--units', type=int, default=1, help="Business units per client")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions of the whole client set")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mock server/UI latency in seconds")
+    parser.add_argument('--generate-delay', type=float, default=0.5, help="Mock report generation seconds")
+    parser.add_argument('--rows', type=int, default=1000, help="Rows per generated report")
+    parser.add_argument('--output', default=f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json",
+                        help="Where to save the JSON results")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.clients, args.units, args.repeat, args.latency, args.generate_delay, args.rows)
+    report = benchmark.run()
+    print_report(report)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
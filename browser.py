@@ -0,0 +1,69 @@
+"""Chrome session construction shared by the automation and the browser pool"""
+from typing import Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from driver_resolver import resolve_driver_path
+import settings
+
+
+def build_chrome_options(download_path: Optional[str] = None) -> Options:
+    """Build the Chrome options used for every automation session"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+
+    chrome_options.add_argument('--start-maximized')
+    chrome_options.add_argument('--disable-notifications')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--disable-popup-blocking')
+    chrome_options.add_argument('--window-position=2000,0')
+    
+    # Additional flags to disable password alerts
+    chrome_options.add_argument('--password-store=basic')
+    chrome_options.add_argument('--no-default-browser-check')
+    chrome_options.add_argument('--no-first-run')
+    chrome_options.add_argument('--disable-default-apps')
+    chrome_options.add_argument('--disable-extensions')
+
+    # Enhanced prefs to disable password manager and alerts
+    prefs = {
+        'download.prompt_for_download': False,
+        'download.directory_upgrade': True,
+        'safebrowsing.enabled': False,  # Changed to False
+        'credentials_enable_service': False,
+        'profile.password_manager_enabled': False,
+        'profile.default_content_setting_values.notifications': 2,
+        'profile.managed_default_content_settings.popups': 2,
+        'autofill.profile_enabled': False,
+        'profile.default_content_settings.popups': 0,
+        'profile.content_settings.exceptions.automatic_downloads.*.setting': 1,
+        'profile.default_content_setting_values.automatic_downloads': 1
+    }
+    if download_path:
+        prefs['download.default_directory'] = download_path
+    chrome_options.add_experimental_option('prefs', prefs)
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
+
+    # Async scripts wait on Vaadin themselves and give up after WAIT_MAX
+    chrome_options.timeouts = {'script': int((settings.WAIT_MAX + 5) * 1000)}
+
+    # DevTools download events are read from the performance log
+    if settings.DOWNLOAD_MODE == 'cdp':
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': False, 'enablePage': True})
+    return chrome_options
+
+
+def create_driver(download_path: Optional[str] = None) -> webdriver.Chrome:
+    """Launch a new Chrome session"""
+    service = Service(resolve_driver_path())
+    return webdriver.Chrome(service=service, options=build_chrome_options(download_path))
+
+
+def set_download_dir(driver: webdriver.Chrome, download_path: str):
+    """Point an already running Chrome session at a new download directory"""
+    driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+        'behavior': 'allow',
+        'downloadPath': download_path,
+    })
@@ -0,0 +1,115 @@
+"""Pool of warm Chrome sessions reused across client runs"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+from urllib.parse import urlparse
+
+from selenium import webdriver
+
+from browser import create_driver
+import settings
+
+
+class BrowserPool:
+    def __init__(self, size: int, origins: Iterable[str] = (settings.BASE_URL,)):
+        if size < 1:
+            raise ValueError(f"size must be at least 1, got {size}")
+        self.size = size
+        self.origins = list(origins)
+        self._idle: "queue.Queue[webdriver.Chrome]" = queue.Queue()
+        self._all: List[webdriver.Chrome] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self, count: Optional[int] = None):
+        """Launch up to `count` (default: size) Chrome sessions in parallel so the first clients find them warm"""
+        count = self.size if count is None else min(count, self.size)
+        missing = count - len(self._all)
+        if missing <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=missing, thread_name_prefix='femsa-pool') as executor:
+            futures = [executor.submit(self._spawn) for _ in range(missing)]
+        # A session that failed to launch is left to acquire() to retry lazily
+        for future in futures:
+            try:
+                self._idle.put(future.result())
+            except Exception as e:
+                print(f"Error pre-warming browser: {str(e)}")
+        print(f"Browser pool started with {len(self._all)} Chrome sessions")
+
+    def _spawn(self) -> webdriver.Chrome:
+        driver = create_driver()
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting discarded browser: {str(e)}")
+
+    def acquire(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """Take an idle Chrome session, launching one lazily if the pool is not full"""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_grow = len(self._all) < self.size
+        if can_grow:
+            return self._spawn()
+        return self._idle.get(timeout=timeout)
+
+    def reset(self, driver: webdriver.Chrome):
+        """Clear cookies, storage and extra windows so the next client starts clean"""
+        origins = set(self.origins)
+        current = urlparse(driver.current_url)
+        if current.scheme in ('http', 'https'):
+            origins.add(f"{current.scheme}://{current.netloc}")
+
+        # Keep only the first window
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origin in origins:
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                'origin': origin,
+                'storageTypes': 'all',
+            })
+        driver.get('about:blank')
+
+    def release(self, driver: webdriver.Chrome):
+        """Reset a session and hand it back; broken sessions are replaced"""
+        if self._closed:
+            self._discard(driver)
+            return
+        try:
+            self.reset(driver)
+        except Exception as e:
+            print(f"Error resetting browser, replacing it: {str(e)}")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def close(self):
+        """Quit every Chrome session owned by the pool"""
+        self._closed = True
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error quitting browser: {str(e)}")
@@ -0,0 +1,122 @@
+"""Track Chrome downloads through DevTools download events"""
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+DOWNLOAD_EVENTS = (
+    'Browser.downloadWillBegin', 'Browser.downloadProgress',
+    'Page.downloadWillBegin', 'Page.downloadProgress',
+)
+
+
+class DownloadRecord:
+    def __init__(self, guid: str, url: str, suggested_filename: str, started: float):
+        self.guid = guid
+        self.url = url
+        self.suggested_filename = suggested_filename
+        self.started = started
+        self.finished: Optional[float] = None
+        self.state = 'inProgress'
+        self.received_bytes = 0
+        self.total_bytes = 0
+        self.path: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.finished - self.started if self.finished else None
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Bytes per second over the whole download"""
+        duration = self.duration
+        return self.received_bytes / duration if duration else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'guid': self.guid,
+            'url': self.url,
+            'filename': self.suggested_filename,
+            'path': self.path,
+            'state': self.state,
+            'bytes': self.received_bytes,
+            'duration': self.duration,
+            'throughput': self.throughput,
+        }
+
+
+class CdpDownloadTracker:
+    """
+    Map each download to its GUID using DevTools events read from
+    chromedriver's performance log. Chrome saves the file under its GUID
+    ('allowAndName'), so the finished file is found without guessing and is
+    then renamed to the name the server suggested.
+    Requires the session to be started with performance logging enabled.
+    """
+    def __init__(self, driver, download_path: str):
+        self.driver = driver
+        self.download_path = download_path
+        self.downloads: Dict[str, DownloadRecord] = {}
+        self.completed: List[DownloadRecord] = []
+        self._mark = 0.0
+
+    def enable(self):
+        """Route downloads to the client directory and turn on download events"""
+        self.driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+            'behavior': 'allowAndName',
+            'downloadPath': self.download_path,
+            'eventsEnabled': True,
+        })
+        self.driver.execute_cdp_cmd('Page.enable', {})
+
+    def drain(self):
+        """Consume pending DevTools events from the performance log"""
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            if method not in DOWNLOAD_EVENTS:
+                continue
+            params = message['params']
+            if method.endswith('downloadWillBegin'):
+                self.downloads[params['guid']] = DownloadRecord(
+                    params['guid'], params.get('url', ''), params.get('suggestedFilename', ''), time.time()
+                )
+                continue
+            record = self.downloads.get(params['guid'])
+            if record is None:
+                continue
+            record.received_bytes = int(params.get('receivedBytes', record.received_bytes))
+            record.total_bytes = int(params.get('totalBytes', record.total_bytes))
+            if params.get('state') in ('completed', 'canceled') and record.finished is None:
+                record.state = params['state']
+                record.finished = time.time()
+
+    def begin(self):
+        """Mark the point after which a new download is expected"""
+        self.drain()
+        self._mark = time.time()
+
+    def wait(self, timeout: float) -> DownloadRecord:
+        """Wait for the download started after begin() and move it to its suggested name"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.drain()
+            for record in self.downloads.values():
+                if record.started < self._mark or record.finished is None or record in self.completed:
+                    continue
+                if record.state == 'canceled':
+                    raise RuntimeError(f"Download {record.suggested_filename} was canceled")
+                self.finish(record)
+                return record
+            time.sleep(0.1)
+        raise TimeoutError(f"No download completed within {timeout}s")
+
+    def finish(self, record: DownloadRecord):
+        guid_path = os.path.join(self.download_path, record.guid)
+        final_path = os.path.join(self.download_path, record.suggested_filename or record.guid)
+        os.replace(guid_path, final_path)
+        record.path = final_path
+        self.completed.append(record)
+        throughput = record.throughput or 0
+        print(f"Downloaded {record.suggested_filename}: {record.received_bytes} bytes "
+              f"in {record.duration:.2f}s ({throughput / 1024:.1f} KiB/s)")
@@ -0,0 +1,41 @@
+"""Per-run, read-only view of a client's business units and file naming patterns"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+
+
+@dataclass(frozen=True)
+class UnitPattern:
+    unidad_negocio_id: int
+    archivo_venta: str
+    archivo_inventario: str
+
+
+class ClientUnits:
+    """
+    File naming patterns for every business unit of a client, loaded once per
+    run. Iteration order matches the report dropdown order used by
+    generate_reports (unidad_negocio_id descending).
+    """
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.by_iteration: Tuple[UnitPattern, ...] = tuple(
+            UnitPattern(row['unidad_negocio_id'], row['archivo_venta'], row['archivo_inventario'])
+            for row in rows
+        )
+        self.by_unit_id: Mapping[int, UnitPattern] = MappingProxyType(
+            {unit.unidad_negocio_id: unit for unit in self.by_iteration}
+        )
+
+    @classmethod
+    def load(cls, db, cliente_id: int) -> 'ClientUnits':
+        """Load the patterns for `cliente_id` with a single query"""
+        rows = db.get_client_units(cliente_id)
+        if not rows:
+            raise ValueError(f"No file patterns found for cliente_id={cliente_id}")
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.by_iteration)
+
+    def __getitem__(self, iteration: int) -> UnitPattern:
+        return self.by_iteration[iteration]
@@ -1,18 +1,60 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
 import mysql.connector
-from mysql.connector import Error
-from typing import List, Dict, Optional, Any, Tuple
+from mysql.connector import Error, IntegrityError, errorcode
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+from typing import List, Dict, Optional, Any, Tuple, Iterator
+from spans import maybe_span
+
+# estado values of log_script_descarga_cadena_cliente runs
+RUN_FAILED = 0
+RUN_SUCCEEDED = 1
+RUN_RUNNING = 2
+
+# A run still marked running after this long is taken to have died
+RUN_LEASE_MINUTES = 120
+
+
+class RunInProgress(Exception):
+    """Another run for the same client and date is still running (or died within its lease)"""
+
+
+def traced_sql(name: str):
+    """Record a span for the statement on the calling thread's active recorder"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, query: str, params: Optional[Tuple] = None):
+            with maybe_span(name, sql=' '.join(query.split())[:120]):
+                return method(self, query, params)
+        return wrapper
+    return decorator
 
 class DatabaseConnector:
-    def __init__(self, host: str = 'localhost', user: str = 'root', password: str = '', database: str = 'python'):
+    def __init__(self, host: str = 'localhost', user: str = 'root', password: str = '', database: str = 'python',
+                 pool_size: int = 0, pool_timeout: float = 30):
+        """
+        pool_size=0 keeps a single connection per connector (not thread-safe).
+        A positive pool_size checks a connection out of a shared pool for every
+        call, so one connector can be used from many threads at once.
+        """
         self.host = host
         self.user = user
         self.password = password
         self.database = database
+        self.pool_size = min(pool_size, pooling.CNX_POOL_MAXSIZE)
+        self.pool_timeout = pool_timeout
+        self.pool = None
+        self._pool_lock = threading.Lock()
         self.connection = None
         self.cursor = None
 
     def connect(self) -> bool:
         """Establish connection to MySQL database"""
+        if self.pool_size:
+            return self.connect_pool()
         try:
             self.connection = mysql.connector.connect(
                 host=self.host,
@@ -27,15 +69,72 @@ class DatabaseConnector:
             print(f"Error connecting to MySQL database: {e}")
             return False
 
+    def connect_pool(self) -> bool:
+        """Create the connection pool on first use"""
+        with self._pool_lock:
+            if self.pool:
+                return True
+            try:
+                self.pool = pooling.MySQLConnectionPool(
+                    pool_name=f"femsa_{id(self)}",
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database
+                )
+                return True
+            except Error as e:
+                print(f"Error creating MySQL connection pool: {e}")
+                return False
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """Borrow a healthy pooled connection for the duration of one call"""
+        if not self.pool and not self.connect_pool():
+            raise PoolError("Connection pool is not available")
+        deadline = time.time() + self.pool_timeout
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except PoolError:
+                # Every connection is checked out, wait for one to come back
+                if time.time() >= deadline:
+                    raise
+                time.sleep(0.05)
+        try:
+            connection.ping(reconnect=True, attempts=2, delay=0)
+            yield connection
+        finally:
+            # Returns the connection to the pool
+            connection.close()
+
     def close(self):
-        """Close database connection"""
+        """Close database connection; pooled connections are already returned after each call"""
+        if self.pool_size:
+            return
         if self.connection and self.connection.is_connected():
             if self.cursor:
                 self.cursor.close()
             self.connection.close()
 
+    @traced_sql('db.query')
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> Optional[List[Dict[str, Any]]]:
         """Execute a SELECT query and return results"""
+        if self.pool_size:
+            try:
+                with self.checkout() as connection:
+                    cursor = connection.cursor(dictionary=True)
+                    try:
+                        cursor.execute(query, params or ())
+                        return cursor.fetchall()
+                    finally:
+                        cursor.close()
+            except Error as e:
+                print(f"Error executing query: {e}")
+                return None
         try:
             if not self.connection or not self.connection.is_connected():
                 self.connect()
@@ -47,8 +146,22 @@ class DatabaseConnector:
             print(f"Error executing query: {e}")
             return None
 
+    @traced_sql('db.insert')
     def execute_insert(self, query: str, params: Optional[Tuple] = None) -> bool:
         """Execute an INSERT query and commit changes"""
+        if self.pool_size:
+            try:
+                with self.checkout() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(query, params or ())
+                        connection.commit()
+                        return True
+                    finally:
+                        cursor.close()
+            except Error as e:
+                print(f"Error executing insert: {e}")
+                return False
         try:
             if not self.connection or not self.connection.is_connected():
                 self.connect()
@@ -60,6 +173,62 @@ class DatabaseConnector:
             print(f"Error executing insert: {e}")
             return False
 
+    @traced_sql('db.update')
+    def execute_update(self, query: str, params: Optional[Tuple] = None) -> Optional[int]:
+        """Execute an UPDATE, commit it and return the number of affected rows"""
+        try:
+            if self.pool_size:
+                with self.checkout() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(query, params or ())
+                        connection.commit()
+                        return cursor.rowcount
+                    finally:
+                        cursor.close()
+
+            if not self.connection or not self.connection.is_connected():
+                self.connect()
+            
+            self.cursor.execute(query, params or ())
+            self.connection.commit()
+            return self.cursor.rowcount
+        except Error as e:
+            print(f"Error executing update: {e}")
+            return None
+
+    @traced_sql('db.insert')
+    def execute_insert_id(self, query: str, params: Optional[Tuple] = None) -> Optional[int]:
+        """
+        Execute an INSERT, commit it and return the generated id.
+        Duplicate key violations are raised so callers can react to them.
+        """
+        try:
+            if self.pool_size:
+                with self.checkout() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(query, params or ())
+                        connection.commit()
+                        return cursor.lastrowid
+                    finally:
+                        cursor.close()
+
+            if not self.connection or not self.connection.is_connected():
+                self.connect()
+            
+            self.cursor.execute(query, params or ())
+            self.connection.commit()
+            return self.cursor.lastrowid
+        except IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise
+            print(f"Error executing insert: {e}")
+            return None
+        except Error as e:
+            print(f"Error executing insert: {e}")
+            return None
+
     def get_client_info(self, cliente: str, cadena: str = 'cruz verde') -> Optional[Dict[str, Any]]:
         """Get client information from database"""
         query = """
@@ -76,25 +245,117 @@ class DatabaseConnector:
         """Check if report was already generated for given date"""
         query = """
             SELECT estado FROM log_script_descarga_cadena_cliente 
-            WHERE cliente = %s AND cadena = %s AND DATE(created_at) = %s
+            WHERE cliente = %s AND cadena = %s
+            AND created_at >= %s AND created_at < %s + INTERVAL 1 DAY
         """
-        result = self.execute_query(query, (cliente, cadena, date))
+        result = self.execute_query(query, (cliente, cadena, date, date))
         return bool(result and result[0]['estado'] == 1)
 
-    def log_report_generation(self, cliente: str, cadena: str, status: int = 0) -> bool:
-        """Log report generation attempt"""
+    def check_last_log_status(self, cliente: str, cadena: str = 'cruz verde') -> Optional[Dict[str, Any]]:
+        """Get today's successful load log entry for the client, if any"""
         query = """
-            INSERT INTO log_script_descarga_cadena_cliente (cliente, cadena, created_at, estado)
-            VALUES (%s, %s, NOW(), %s)
+            SELECT estado, updated_at 
+            FROM log_script_carga_cadena_cliente 
+            WHERE cliente = %s 
+            AND cadena = %s
+            AND updated_at >= CURDATE() AND updated_at < CURDATE() + INTERVAL 1 DAY
+            AND estado = 1
+            LIMIT 1
         """
-        return self.execute_insert(query, (cliente, cadena, status))
+        result = self.execute_query(query, (cliente, cadena))
+        return result[0] if result else None
+
+    def log_report_generation(self, cliente: str, cadena: str, status: int = RUN_FAILED,
+                              fecha: Optional[str] = None) -> Optional[int]:
+        """
+        Log report generation attempt and return its run id.
+        Only one run is kept per cliente/cadena/fecha: a failed earlier run for
+        the same date (or a running one past its lease) is claimed again, a
+        successful one rejects the new run (None) and a still running one
+        raises RunInProgress. Raises RuntimeError when the run cannot be
+        registered at all.
+        """
+        query = """
+            INSERT INTO log_script_descarga_cadena_cliente (cliente, cadena, fecha, created_at, estado)
+            VALUES (%s, %s, %s, NOW(), %s)
+        """
+        try:
+            run_id = self.execute_insert_id(query, (cliente, cadena, fecha, status))
+        except IntegrityError:
+            return self.claim_run(cliente, cadena, fecha, status)
+        if run_id is None:
+            raise RuntimeError(f"Could not register a run for {cliente} on {fecha}")
+        return run_id
+
+    def claim_run(self, cliente: str, cadena: str, fecha: Optional[str], status: int) -> Optional[int]:
+        """Take over the existing run for the date unless it succeeded or is still running"""
+        existing = self.execute_query("""
+            SELECT id, estado FROM log_script_descarga_cadena_cliente
+            WHERE cliente = %s AND cadena = %s AND fecha = %s
+        """, (cliente, cadena, fecha))
+        if not existing:
+            raise RuntimeError(f"Could not read the existing run for {cliente} on {fecha}")
+        run = existing[0]
+        if run['estado'] == RUN_SUCCEEDED:
+            print(f"Run for {cliente} on {fecha} already completed, rejecting duplicate")
+            return None
+
+        # Conditional update so that only one of several concurrent runs wins the claim
+        claimed = self.execute_update("""
+            UPDATE log_script_descarga_cadena_cliente
+            SET estado = %s, updated_at = NOW()
+            WHERE id = %s
+            AND (estado = %s OR (estado = %s AND COALESCE(updated_at, created_at) < NOW() - INTERVAL %s MINUTE))
+        """, (status, run['id'], RUN_FAILED, RUN_RUNNING, RUN_LEASE_MINUTES))
+        if claimed is None:
+            raise RuntimeError(f"Could not claim the existing run for {cliente} on {fecha}")
+        if not claimed:
+            raise RunInProgress(f"Run {run['id']} for {cliente} on {fecha} is still running")
+        print(f"Reusing run {run['id']} for {cliente} on {fecha}")
+        return run['id']
+
+    def update_report_status(self, cliente: str, cadena: str, status: int = 1,
+                             run_id: Optional[int] = None) -> bool:
+        """Update report generation status, by run id when one is known"""
+        if run_id is not None:
+            query = """
+                UPDATE log_script_descarga_cadena_cliente 
+                SET estado = %s, updated_at = NOW()
+                WHERE id = %s
+            """
+            return self.execute_insert(query, (status, run_id))
 
-    def update_report_status(self, cliente: str, cadena: str, status: int = 1) -> bool:
-        """Update report generation status"""
         query = """
             UPDATE log_script_descarga_cadena_cliente 
             SET estado = %s, updated_at = NOW()
             WHERE cliente = %s AND cadena = %s 
             ORDER BY id DESC LIMIT 1
         """
-        return self.execute_insert(query, (status, cliente, cadena))
\ No newline at end of file
+        return self.execute_insert(query, (status, cliente, cadena))
+
+    def get_pending_clients(self, cadena: str = 'cruz verde') -> Optional[List[str]]:
+        """Get the clients of the chain without a successful load log for today, in one query"""
+        query = """
+            SELECT DISTINCT c.cliente FROM cliente c
+            WHERE c.cadena = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM log_script_carga_cadena_cliente l
+                WHERE l.cliente = c.cliente
+                AND l.cadena = c.cadena
+                AND l.updated_at >= CURDATE() AND l.updated_at < CURDATE() + INTERVAL 1 DAY
+                AND l.estado = 1
+            )
+            ORDER BY c.cliente
+        """
+        result = self.execute_query(query, (cadena,))
+        return [row['cliente'] for row in result] if result is not None else None
+
+    def get_client_units(self, cliente_id: int) -> List[Dict[str, Any]]:
+        """Get the business units and file naming patterns of a client"""
+        query = """
+            SELECT unidad_negocio_id, archivo_venta, archivo_inventario 
+            FROM cliente_unidad_negocio 
+            WHERE cliente_id = %s
+            ORDER BY unidad_negocio_id DESC
+        """
+        return self.execute_query(query, (cliente_id,)) or []
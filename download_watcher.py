@@ -0,0 +1,120 @@
+"""Detect finished Chrome downloads as soon as they land in the download directory"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Optional, Set, Tuple
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+EVENT_HEADER = struct.Struct('iIII')
+
+CHROME_TEMP_SUFFIX = '.crdownload'
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class DownloadWatcher:
+    """
+    Watch a directory for a new, fully written file with one of the given
+    extensions. Uses inotify on Linux and falls back to polling elsewhere.
+    Start the watcher before triggering the download so nothing is missed.
+    """
+    def __init__(self, directory: str, extensions: Tuple[str, ...] = ('.zip', '.csv'),
+                 poll_interval: float = 0.1):
+        self.directory = directory
+        self.extensions = extensions
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._existing: Set[str] = set()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """Begin watching; the polling fallback also remembers which files were already there"""
+        if _libc is not None:
+            fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                # Only a finished write or a rename into place means the file is complete;
+                # a file created under its final name may still be being written
+                mask = IN_CLOSE_WRITE | IN_MOVED_TO
+                if _libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) >= 0:
+                    self._fd = fd
+                    return
+                os.close(fd)
+        self._existing = set(os.listdir(self.directory))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _is_complete(self, name: str) -> bool:
+        if name in self._existing or not name.endswith(self.extensions):
+            return False
+        path = os.path.join(self.directory, name)
+        return os.path.isfile(path) and not os.path.exists(path + CHROME_TEMP_SUFFIX)
+
+    def _scan(self) -> Optional[str]:
+        for name in os.listdir(self.directory):
+            if self._is_complete(name):
+                return os.path.join(self.directory, name)
+        return None
+
+    def _read_events(self, timeout: float) -> Optional[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return None
+        data = os.read(self._fd, 65536)
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if name.endswith(CHROME_TEMP_SUFFIX):
+                name = name[:-len(CHROME_TEMP_SUFFIX)]
+            if self._is_complete(name):
+                return os.path.join(self.directory, name)
+        return None
+
+    def wait(self, timeout: float) -> str:
+        """Return the path of the first new file once Chrome finished writing it"""
+        deadline = time.time() + timeout
+        # inotify queued anything that finished since start(); polling has to look
+        found = self._scan() if self._fd is None else None
+        while found is None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"No new {'/'.join(self.extensions)} file in {self.directory} after {timeout}s"
+                )
+            if self._fd is not None:
+                found = self._read_events(min(remaining, 1.0))
+            else:
+                time.sleep(min(remaining, self.poll_interval))
+                found = self._scan()
+        print(f"Download finished: {found}")
+        return found
@@ -0,0 +1,104 @@
+"""Count WebDriver commands and their latency, per step and per run"""
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+ORIGINAL_EXECUTE = '_femsa_original_execute'
+
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'histogram': {label: n for label, n in zip(labels, self.histogram) if n},
+        }
+
+
+class CommandMetrics:
+    """
+    Every WebDriver call (find_element, get_attribute, execute_script,
+    switch_to.frame...) is one HTTP round-trip to chromedriver. This records
+    each one by command name, overall and under the step it ran in.
+    """
+    def __init__(self):
+        self.by_command: Dict[str, CommandStats] = {}
+        self.by_step: Dict[str, Dict[str, CommandStats]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, command: str, duration: float, step: Optional[str]):
+        with self._lock:
+            self.by_command.setdefault(command, CommandStats()).add(duration)
+            step_stats = self.by_step.setdefault(step or '(none)', {})
+            step_stats.setdefault(command, CommandStats()).add(duration)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'run': {command: stats.as_dict() for command, stats in sorted(self.by_command.items())},
+                'steps': {
+                    step: {
+                        'commands': sum(stats.count for stats in commands.values()),
+                        'time': sum(stats.total for stats in commands.values()),
+                        'by_command': {command: stats.count for command, stats in sorted(commands.items())},
+                    }
+                    for step, commands in self.by_step.items()
+                },
+            }
+
+    def print_summary(self):
+        summary = self.summary()
+        total = sum(stats['count'] for stats in summary['run'].values())
+        total_time = sum(stats['total'] for stats in summary['run'].values())
+        print(f"WebDriver commands: {total} round-trips, {total_time:.2f}s")
+        for command, stats in sorted(summary['run'].items(), key=lambda item: -item[1]['total']):
+            histogram = ' '.join(f"{label}:{n}" for label, n in stats['histogram'].items())
+            print(f"  {command:<40} {stats['count']:>5} x mean {stats['mean'] * 1000:>7.1f}ms "
+                  f"max {stats['max'] * 1000:>7.1f}ms  {histogram}")
+        print("  per step:")
+        for step, stats in sorted(summary['steps'].items(), key=lambda item: -item[1]['time']):
+            print(f"  {step:<40} {stats['commands']:>5} commands {stats['time']:>8.2f}s")
+
+
+def instrument(driver, metrics: CommandMetrics, current_step: Callable[[], Optional[str]]):
+    """Route every command of `driver` through `metrics`"""
+    executor = driver.command_executor
+    original: Callable = getattr(executor, ORIGINAL_EXECUTE, None) or executor.execute
+    setattr(executor, ORIGINAL_EXECUTE, original)
+
+    def execute(command: str, params: Optional[Dict[str, Any]] = None):
+        started = time.perf_counter()
+        try:
+            return original(command, params)
+        finally:
+            metrics.record(command, time.perf_counter() - started, current_step())
+
+    executor.execute = execute
+
+
+def uninstrument(driver):
+    """Restore the driver's own command execution, e.g. before returning it to a pool"""
+    executor = driver.command_executor
+    original = getattr(executor, ORIGINAL_EXECUTE, None)
+    if original is not None:
+        executor.execute = original
+        delattr(executor, ORIGINAL_EXECUTE)
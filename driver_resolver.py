@@ -0,0 +1,121 @@
+"""Resolve the chromedriver binary without hitting webdriver_manager on every run"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Optional, Dict, Any
+
+import settings
+
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser')
+VERSION_RE = re.compile(r'(\d+\.\d+\.\d+\.\d+)')
+
+
+def _read_version(binary: str) -> Optional[str]:
+    """Run `<binary> --version` and extract the dotted version number"""
+    try:
+        output = subprocess.run(
+            [binary, '--version'], capture_output=True, text=True, timeout=10
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_RE.search(output)
+    return match.group(1) if match else None
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split('.')[0] if version else None
+
+
+class DriverResolver:
+    def __init__(self, manifest_path: str = settings.DRIVER_MANIFEST,
+                 pinned_path: Optional[str] = settings.CHROMEDRIVER_PATH,
+                 chrome_binary: Optional[str] = settings.CHROME_BINARY):
+        self.manifest_path = manifest_path
+        self.pinned_path = pinned_path
+        self.chrome_binary = chrome_binary
+        self._lock = threading.Lock()
+        self._resolved: Optional[str] = None
+
+    def chrome_version(self) -> Optional[str]:
+        """Get the version of the installed Chrome"""
+        candidates = [self.chrome_binary] if self.chrome_binary else CHROME_BINARIES
+        for binary in candidates:
+            if shutil.which(binary) or os.path.isfile(binary):
+                version = _read_version(binary)
+                if version:
+                    return version
+        return None
+
+    def load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, manifest: Dict[str, Any]):
+        """Write the manifest atomically so concurrent processes never read half a file"""
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def resolve(self) -> str:
+        """Get the chromedriver path, consulting webdriver_manager only when Chrome changed"""
+        if self.pinned_path:
+            return self.pinned_path
+
+        with self._lock:
+            if self._resolved and os.path.isfile(self._resolved):
+                return self._resolved
+
+            chrome_version = self.chrome_version()
+            manifest = self.load_manifest()
+            entry = manifest.get(chrome_version) if chrome_version else None
+            if entry and os.path.isfile(entry['driver_path']):
+                self._resolved = entry['driver_path']
+                return self._resolved
+
+            try:
+                from webdriver_manager.chrome import ChromeDriverManager
+                driver_path = ChromeDriverManager().install()
+            except Exception as e:
+                fallback = self.offline_fallback(manifest, chrome_version)
+                if not fallback:
+                    raise
+                print(f"webdriver_manager unavailable ({str(e)}), using cached driver {fallback}")
+                self._resolved = fallback
+                return self._resolved
+
+            if chrome_version:
+                manifest[chrome_version] = {
+                    'driver_path': driver_path,
+                    'driver_version': _read_version(driver_path),
+                    'resolved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                }
+                self.save_manifest(manifest)
+            self._resolved = driver_path
+            return self._resolved
+
+    def offline_fallback(self, manifest: Dict[str, Any], chrome_version: Optional[str]) -> Optional[str]:
+        """Pick a recorded driver with the same major version as Chrome"""
+        major = _major(chrome_version)
+        for recorded_version, entry in sorted(manifest.items(), reverse=True):
+            if major and _major(recorded_version) != major:
+                continue
+            if os.path.isfile(entry['driver_path']):
+                return entry['driver_path']
+        return None
+
+
+_default_resolver = DriverResolver()
+
+
+def resolve_driver_path() -> str:
+    """Resolve the chromedriver path using the process-wide resolver"""
+    return _default_resolver.resolve()
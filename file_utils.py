@@ -0,0 +1,38 @@
+"""File helpers for moving downloaded report data into place"""
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Callable, List
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def extract_members(zip_path: str, matches: Callable[[str], bool], dest_path: str,
+                    buffer_size: int = COPY_BUFFER_SIZE) -> List[str]:
+    """
+    Stream the members of `zip_path` whose file name satisfies `matches` into
+    `dest_path` without extracting anything else. Each member is copied with
+    a bounded buffer to a temp file next to `dest_path`, then atomically
+    replaces it, so readers never see a partially written file.
+
+    Returns the names of the members that were extracted.
+    """
+    extracted = []
+    dest_dir = os.path.dirname(dest_path)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not matches(name):
+                continue
+            fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix='.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as dest, zip_ref.open(member) as src:
+                    shutil.copyfileobj(src, dest, buffer_size)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            extracted.append(name)
+    return extracted
@@ -0,0 +1,34 @@
+"""Browsing-context tracking so frame switches are only sent when the context changes"""
+from typing import Optional, Union
+
+TOP = 'top'
+
+
+class FrameContext:
+    """
+    Remembers which browsing context the driver is in. Switching to the
+    context it is already in costs nothing; anything that may have replaced
+    the documents (login, logout, navigation, a failed step) must call
+    invalidate() so the next switch is issued for real.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.current: Optional[Union[str, int]] = None
+
+    def top(self):
+        """Make the top-level document the current context"""
+        if self.current != TOP:
+            self.driver.switch_to.default_content()
+            self.current = TOP
+
+    def frame(self, index: int = 0):
+        """Make the top-level document's `index`-th frame the current context"""
+        if self.current == index:
+            return
+        self.top()
+        self.driver.switch_to.frame(index)
+        self.current = index
+
+    def invalidate(self):
+        """Forget the current context, e.g. after the page navigated"""
+        self.current = None
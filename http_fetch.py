@@ -0,0 +1,90 @@
+"""Fetch report files over HTTP with the browser's session cookies"""
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FILENAME_RE = re.compile(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', re.IGNORECASE)
+
+
+def session_cookies(driver) -> requests.cookies.RequestsCookieJar:
+    """Copy the cookies of the current document from the Selenium session"""
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in driver.get_cookies():
+        jar.set(cookie['name'], cookie['value'],
+                domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return jar
+
+
+class ReportFetcher:
+    """
+    Stream report files to disk using a pooled HTTP client. Transfers run on
+    a small thread pool so the browser can move on to the next UI step while
+    the file is still downloading. Interrupted transfers resume from the
+    bytes already written when the server supports range requests.
+    """
+    def __init__(self, workers: int = 2, chunk_size: int = 256 * 1024,
+                 max_attempts: int = 3, timeout: float = 60):
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='femsa-fetch')
+
+    def submit(self, url: str, directory: str, cookies: requests.cookies.RequestsCookieJar,
+               headers: Optional[Dict[str, str]] = None) -> "Future[str]":
+        """Start fetching `url` into `directory` in the background"""
+        return self.executor.submit(self.fetch, url, directory, cookies, headers)
+
+    def fetch(self, url: str, directory: str, cookies: requests.cookies.RequestsCookieJar,
+              headers: Optional[Dict[str, str]] = None) -> str:
+        """Download `url` into `directory` and return the final file path"""
+        started = time.time()
+        filename = os.path.basename(unquote(urlparse(url).path)) or 'download'
+        part_path = os.path.join(directory, f".{filename}.part")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+        for attempt in range(1, self.max_attempts + 1):
+            written = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            request_headers = dict(headers or {})
+            if written:
+                request_headers['Range'] = f"bytes={written}-"
+            try:
+                with self.session.get(url, cookies=cookies, headers=request_headers,
+                                      stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    disposition = FILENAME_RE.search(response.headers.get('Content-Disposition', ''))
+                    if disposition:
+                        filename = os.path.basename(unquote(disposition.group(1)))
+                    # A full response means the server ignored the range, start over
+                    mode = 'ab' if written and response.status_code == 206 else 'wb'
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                print(f"Fetch attempt {attempt}/{self.max_attempts} for {filename} interrupted: {str(e)}")
+                if attempt == self.max_attempts:
+                    raise
+                time.sleep(attempt)
+
+        final_path = os.path.join(directory, filename)
+        os.replace(part_path, final_path)
+        size = os.path.getsize(final_path)
+        duration = time.time() - started
+        print(f"Fetched {filename}: {size} bytes in {duration:.2f}s")
+        return final_path
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
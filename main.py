@@ -1,72 +1,118 @@
 import glob
 import os
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from datetime import datetime, timedelta
 import time
-import zipfile
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.action_chains import ActionChains
 import calendar
 import time
 import sys
-from typing import Optional, Dict, Any, List
-from database_connector import DatabaseConnector
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, Tuple, NamedTuple, Sequence
+from database_connector import DatabaseConnector, RunInProgress, RUN_RUNNING
+from browser import create_driver, set_download_dir
+from waits import (WaitEngine, element_ready, element_present, overlay_closed, document_ready, link_hrefs,
+                   new_link, replaced, frame_navigated)
+from download_watcher import DownloadWatcher
+from cdp_downloads import CdpDownloadTracker
+from http_fetch import ReportFetcher, session_cookies
+from file_utils import extract_members
+from client_units import ClientUnits
+from spans import SpanRecorder, traced, activate, active_recorder
+from trace_export import write_run_trace
+from frames import FrameContext
+from navigation import REPORT_MENUS, ROUTES
+from driver_metrics import CommandMetrics, instrument, uninstrument
+from vaadin import vaadin_idle, select_options, select_item, set_pickers
+import settings
+
+class DateRangeResult(NamedTuple):
+    """What set_date_range asked the pickers for and what they ended up holding"""
+    expected_start: str
+    expected_end: str
+    start: Optional[str]
+    end: Optional[str]
+    idle: bool = True
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and (self.start, self.end) == (self.expected_start, self.expected_end)
+
 
 class FEMSAAutomation:
-    def __init__(self, cliente: str, db_connector: DatabaseConnector):
+    def __init__(self, cliente: str, db_connector: DatabaseConnector, driver: Optional[webdriver.Chrome] = None,
+                 spans: Optional[SpanRecorder] = None, base_url: Optional[str] = None,
+                 parent: Optional['FEMSAAutomation'] = None, download_subdir: Optional[str] = None):
         self.cliente = cliente
         self.db = db_connector
-        self.client_info = self.get_client_info()
-        self.base_url = "https://femsab2b.bbr.cl"
-        self.sales_dates = None
-        self.available_options = []
+        # A sibling session works for `parent`'s run: it shares its client data
+        # and spans, and downloads into its own subdirectory of the Zip folder
+        self.parent = parent
+        self.download_subdir = download_subdir
+        
+        # Step timing, tagged with the report type and iteration being worked on;
+        # DB calls made from this thread are recorded as well
+        self.owns_spans = spans is None and parent is None
+        self.spans = spans or (parent.spans if parent else SpanRecorder.for_run(cliente))
+        self.current_report_type: Optional[str] = None
+        self.current_iteration: Optional[int] = None
+        activate(self.spans)
         
-        # Setup Chrome
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-
-        chrome_options.add_argument('--start-maximized')
-        chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_argument('--disable-popup-blocking')
-        chrome_options.add_argument('--window-position=2000,0')
+        if parent:
+            self.client_info = parent.client_info
+            self.units = parent.units
+        else:
+            self.client_info = self.get_client_info()
+            self.units = ClientUnits.load(self.db, self.client_info['id'])
+        self.base_url = base_url or (parent.base_url if parent else settings.BASE_URL)
+        self.sales_dates = None
+        self.run_id: Optional[int] = None
+        self.available_options: List[Dict[str, str]] = []
+        self.routed_report: Optional[str] = None
+        self.last_download: Optional[str] = None
+        self.pending_download: Optional[Future] = None
+        self.processing_jobs: List[Future] = []
         
-        # Additional flags to disable password alerts
-        chrome_options.add_argument('--password-store=basic')
-        chrome_options.add_argument('--no-default-browser-check')
-        chrome_options.add_argument('--no-first-run')
-        chrome_options.add_argument('--disable-default-apps')
-        chrome_options.add_argument('--disable-extensions')
+        # Setup Chrome, reusing a pooled session when one is provided
         zip_path = self.get_download_path()  # Get the full zip path
-
-        # Enhanced prefs to disable password manager and alerts
-        prefs = {
-            'download.default_directory': zip_path,
-            'download.prompt_for_download': False,
-            'download.directory_upgrade': True,
-            'safebrowsing.enabled': False,  # Changed to False
-            'credentials_enable_service': False,
-            'profile.password_manager_enabled': False,
-            'profile.default_content_setting_values.notifications': 2,
-            'profile.managed_default_content_settings.popups': 2,
-            'autofill.profile_enabled': False,
-            'profile.password_manager_enabled': False,
-            'profile.default_content_settings.popups': 0,
-            'profile.content_settings.exceptions.automatic_downloads.*.setting': 1,
-            'profile.default_content_setting_values.automatic_downloads': 1
-        }
-        chrome_options.add_experimental_option('prefs', prefs)
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
+        self.owns_driver = driver is None
+        if driver is None:
+            self.driver = create_driver(zip_path)
+        else:
+            self.driver = driver
+            set_download_dir(self.driver, zip_path)
         
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # Count chromedriver round-trips under the step that issued them
+        self.command_metrics = CommandMetrics()
+        instrument(self.driver, self.command_metrics, self.current_step)
+        self.frames = FrameContext(self.driver)
         self.wait = WebDriverWait(self.driver, 20)
+        self.waiter = WaitEngine(self.driver, spans=self.spans)
+
+        # Track downloads through DevTools events when configured
+        self.download_tracker = None
+        if settings.DOWNLOAD_MODE == 'cdp':
+            self.download_tracker = CdpDownloadTracker(self.driver, zip_path)
+            self.download_tracker.enable()
+
+        # Fetch report links directly and process them while the browser moves on
+        self.fetcher = None
+        self.processing_executor = None
+        if settings.DOWNLOAD_MODE == 'http':
+            self.fetcher = ReportFetcher()
+            self.processing_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='femsa-process', initializer=activate, initargs=(self.spans,)
+            )
+
+    def current_step(self) -> Optional[str]:
+        """Name of the innermost step running on the calling thread, not counting its waits and DB calls"""
+        span = self.spans.current(skip=('wait.', 'db.'))
+        return span['name'] if span else None
 
     def get_client_info(self) -> Dict[str, Any]:
         """Get client information from database"""
@@ -77,9 +123,9 @@ class FEMSAAutomation:
 
     def get_download_path(self) -> str:
         """Get download path based on client name"""
-        base_path = "/home/b2b_pharmatender/archivos_csv/carga"
-        client_path = os.path.join(base_path, self.client_info['Nombre'], 'CRUZ_VERDE')
-        zip_path = os.path.join(client_path, 'Zip')
+        zip_path = os.path.join(self.get_extraction_path(), 'Zip')
+        if self.download_subdir:
+            zip_path = os.path.join(zip_path, self.download_subdir)
         
         # Create directories if they don't exist
         os.makedirs(zip_path, exist_ok=True)
@@ -87,7 +133,8 @@ class FEMSAAutomation:
 
     def get_extraction_path(self) -> str:
         """Get path for extracted files"""
-        return os.path.dirname(self.get_download_path())
+        base_path = settings.DATA_DIR
+        return os.path.join(base_path, self.client_info['Nombre'], 'CRUZ_VERDE')
 
     def check_existing_report(self) -> bool:
         """Check if report was already generated for current date"""
@@ -96,31 +143,6 @@ class FEMSAAutomation:
         return self.db.check_report_status(self.sales_dates['fecha'], self.cliente)
     
 
-    def check_last_log_status(self):
-        """Check if there's already a successful log entry for today"""
-        try:
-            query = """
-                SELECT estado, updated_at 
-                FROM log_script_carga_cadena_cliente 
-                WHERE cliente = %s 
-                AND cadena = 'cruz verde'
-                AND DATE(updated_at) = CURDATE()
-                AND estado = 1
-                LIMIT 1
-            """
-            result = self.db.execute_query(query, (self.cliente,))
-            
-            if result and len(result) > 0:
-                print(f"Found existing successful log for today: {result[0]}")
-                return True
-            
-            print("No successful log found for today")
-            return False
-                
-        except Exception as e:
-            print(f"Error checking last log status: {str(e)}")
-            return False
-    
     def check_date_validity(self):
         """Check if scraped date is not too old"""
         try:
@@ -133,8 +155,9 @@ class FEMSAAutomation:
             
             if difference.days > 2:
                 print(f"Scraped date ({scraped_date}) is more than 2 days old from today ({today})")
-                self.db.log_report_generation(self.cliente, 'cruz verde')
-                self.db.update_report_status(self.cliente, 'cruz verde', 0)
+                self.run_id = self.db.log_report_generation(self.cliente, 'cruz verde', fecha=self.sales_dates['fecha'])
+                if self.run_id:
+                    self.db.update_report_status(self.cliente, 'cruz verde', 0, self.run_id)
                 return False
                 
             return True
@@ -143,9 +166,11 @@ class FEMSAAutomation:
             print(f"Error checking date validity: {str(e)}")
             return False
 
+    @traced('login')
     def login(self):
         """Login to FEMSA B2B platform"""
         try:
+            self.frames.invalidate()
             self.driver.get(self.base_url)
             
             # Select Chile and Salud
@@ -177,23 +202,23 @@ class FEMSAAutomation:
         except Exception as e:
             print(f"Login failed: {str(e)}")
             raise
+    @traced('logout')
     def logout(self):
         """Logout to clear the session """
         try:
-            time.sleep(3)
-            self.driver.switch_to.default_content()
+            self.frames.top()
+            self.waiter.settle('logout.ready', 3, element_ready((By.ID, "btn-logout")), overlay_closed())
 
-            
-
-            # Click filter button
+            # Click logout button
             logout_button = self.wait.until(
                 EC.element_to_be_clickable((By.ID, "btn-logout"))
             )
             logout_button.click()
-            time.sleep(2)
+            self.frames.invalidate()
             
-            # Wait for download to complete
-            time.sleep(5)
+            # Wait for the logout round-trip to land on the next page
+            self.waiter.settle('logout.done', 7, document_ready(),
+                               lambda d: not d.find_elements(By.ID, "btn-logout"))
             print(f"Clicked logout button successfully")
 
         except Exception as e:
@@ -201,6 +226,7 @@ class FEMSAAutomation:
             raise
 
 
+    @traced('generate_reports')
     def generate_reports(self):
         """Generate and download all required reports for both sales and inventory"""
         try:
@@ -209,158 +235,251 @@ class FEMSAAutomation:
                 print(f"Reports already generated for {self.sales_dates['fecha']}")
                 return False
 
-            # Log generation attempt
-            self.db.log_report_generation(self.cliente, 'cruz verde')
+            # Log generation attempt; a run for this date may already be registered.
+            # A failed registration or a run still in progress raises, a completed one is skipped
+            self.run_id = self.db.log_report_generation(self.cliente, 'cruz verde', RUN_RUNNING,
+                                                        self.sales_dates['fecha'])
+            if not self.run_id:
+                print(f"Run for {self.sales_dates['fecha']} already completed, skipping")
+                return False
 
             # Get number of iterations based on unidad_negocio
-            iterations = self.client_info['unidad_negocio']
-            
-            # Process Sales Reports
-            print("Starting Sales Reports Generation...")
-            self.navigate_to_sales_report()
-            
-            for i in range(iterations):
-                print(f"Processing sales report iteration {i+1}/{iterations}")
-                
-                if i == 0:
-                    # First iteration follows normal flow
-                    self.select_dropdown_option(i)
-                    self.set_date_range()
-                    self.download_report(i)
-                    self.process_downloaded_files(i, 'ventas')  # Specify ventas
-                else:
-                    # Subsequent iterations use filter button
-                    self.filter_button()
-                    self.select_dropdown_option(i)
-                    self.download_report(i)
-                    self.process_downloaded_files(i, 'ventas')  # Specify ventas
-                    time.sleep(1)
-            
-            # Process Inventory Reports
-            print("Starting Inventory Reports Generation...")
-            self.navigate_to_inventory_report()
-            
-            for i in range(iterations):
-                print(f"Processing inventory report iteration {i+1}/{iterations}")
-                
-                if i == 0:
-                    # First iteration follows normal flow
-                    self.select_dropdown_option(i)
-                    self.download_report2(i)
-                    self.process_downloaded_files(i, 'inventario')  # Specify inventario
-                else:
-                    # Subsequent iterations use filter button
-                    self.filter_button()
-                    self.select_dropdown_option(i)
-                    self.download_report2(i)
-                    self.process_downloaded_files(i, 'inventario')  # Specify inventario
-                    time.sleep(1)
+            iterations = range(self.client_info['unidad_negocio'])
+            
+            # This session takes the first job, sibling sessions the rest
+            (own_reports, own_units), *others = self.plan_sessions(iterations)
+            if others:
+                with ThreadPoolExecutor(max_workers=len(others), thread_name_prefix='femsa-session',
+                                        initializer=activate, initargs=(self.spans,)) as executor:
+                    siblings = [
+                        executor.submit(self.run_in_sibling, f"{'_'.join(reports)}_{n}", reports, units)
+                        for n, (reports, units) in enumerate(others, 1)
+                    ]
+                    self.run_pipelines(own_reports, own_units)
+                    for sibling in siblings:
+                        sibling.result()
+            else:
+                self.run_pipelines(own_reports, own_units)
             
             # Only update report status after both sales and inventory reports are complete
             print("All reports generated successfully")
             self.logout()
-            self.db.update_report_status(self.cliente, 'cruz verde', 1)
+            self.db.update_report_status(self.cliente, 'cruz verde', 1, self.run_id)
             return True
             
+        except RunInProgress:
+            raise
         except Exception as e:
             print(f"Report generation failed: {str(e)}")
             # Log failure
-            self.db.update_report_status(self.cliente, 'cruz verde', 0)
+            if self.run_id:
+                self.db.update_report_status(self.cliente, 'cruz verde', 0, self.run_id)
             raise
+    @traced('sales_pipeline')
+    def run_sales_pipeline(self, iterations: Sequence[int]):
+        """Navigate to the sales report and download and process it for each unit in `iterations`"""
+        print("Starting Sales Reports Generation...")
+        self.current_report_type = 'ventas'
+        self.current_iteration = None
+        self.navigate_to_sales_report()
+        
+        for position, i in enumerate(iterations):
+            print(f"Processing sales report iteration {i+1}/{self.client_info['unidad_negocio']}")
+            self.current_iteration = i
+            
+            if position == 0:
+                # First iteration follows normal flow
+                if not self.select_dropdown_option(i):
+                    raise Exception(f"Business unit {i + 1} is not offered in the dropdown")
+                self.apply_date_range()
+                self.download_report(i)
+                self.process_downloaded_files(i, 'ventas')  # Specify ventas
+            else:
+                # Subsequent iterations use filter button
+                self.filter_button()
+                if not self.select_dropdown_option(i):
+                    raise Exception(f"Business unit {i + 1} is not offered in the dropdown")
+                self.download_report(i)
+                self.process_downloaded_files(i, 'ventas')  # Specify ventas
+                self.waiter.settle('sales.iteration_gap', 1, overlay_closed())
+        self.wait_for_processing()
+
+    @traced('inventory_pipeline')
+    def run_inventory_pipeline(self, iterations: Sequence[int]):
+        """Navigate to the inventory report and download and process it for each unit in `iterations`"""
+        print("Starting Inventory Reports Generation...")
+        self.current_report_type = 'inventario'
+        self.current_iteration = None
+        self.navigate_to_inventory_report()
+        
+        for position, i in enumerate(iterations):
+            print(f"Processing inventory report iteration {i+1}/{self.client_info['unidad_negocio']}")
+            self.current_iteration = i
+            
+            if position == 0:
+                # First iteration follows normal flow
+                if not self.select_dropdown_option(i):
+                    raise Exception(f"Business unit {i + 1} is not offered in the dropdown")
+                self.download_report2(i)
+                self.process_downloaded_files(i, 'inventario')  # Specify inventario
+            else:
+                # Subsequent iterations use filter button
+                self.filter_button()
+                if not self.select_dropdown_option(i):
+                    raise Exception(f"Business unit {i + 1} is not offered in the dropdown")
+                self.download_report2(i)
+                self.process_downloaded_files(i, 'inventario')  # Specify inventario
+                self.waiter.settle('inventory.iteration_gap', 1, overlay_closed())
+        self.wait_for_processing()
+
+    def plan_sessions(self, iterations: Sequence[int]) -> List[Tuple[Tuple[str, ...], Sequence[int]]]:
+        """
+        Split the run into (report types, units) jobs, one per browser session.
+        Units are dealt round-robin over the UNIT_CONCURRENCY sessions; with
+        PARALLEL_PIPELINES sales and inventory each get their share of them
+        (at least one), otherwise one session runs both for its units.
+        """
+        groups = [('ventas',), ('inventario',)] if settings.PARALLEL_PIPELINES else [('ventas', 'inventario')]
+        sessions = max(1, min(len(iterations), settings.UNIT_CONCURRENCY // len(groups)))
+        return [(reports, iterations[k::sessions]) for reports in groups for k in range(sessions)]
+
+    def run_pipelines(self, report_types: Sequence[str], iterations: Sequence[int]):
+        """Run the given report pipelines, in order, for the units in `iterations`"""
+        for report_type in report_types:
+            if report_type == 'ventas':
+                self.run_sales_pipeline(iterations)
+            else:
+                self.run_inventory_pipeline(iterations)
+
+    def run_in_sibling(self, download_subdir: str, report_types: Sequence[str], iterations: Sequence[int]):
+        """Run report pipelines in another, separately logged-in browser session"""
+        sibling = FEMSAAutomation(self.cliente, self.db, parent=self, download_subdir=download_subdir)
+        try:
+            sibling.login()
+            sibling.sales_dates = self.sales_dates
+            sibling.run_pipelines(report_types, iterations)
+            sibling.logout()
+        finally:
+            sibling.close()
+
+    @traced('navigate_to_sales_report')
     def navigate_to_sales_report(self):
         """Navigate to sales report section"""
+        self.navigate_to_report('ventas')
+
+    @traced('navigate_to_inventory_report')
+    def navigate_to_inventory_report(self):
+        """Navigate to sales inventory section"""
+        self.navigate_to_report('inventario')
+
+    def navigate_to_report(self, report_type: str):
+        """Open a report page through its learned route, walking the menu when there is none"""
         try:
-            # Wait for page to load after login
-            time.sleep(3)
-            
-            def click_with_retry(selector, description, max_retries=3):
-                """Helper function to implement click with retry mechanism"""
-                for attempt in range(max_retries):
-                    try:
-                        element = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        time.sleep(1)
-                        element.click()
-                        return True
-                    except Exception as e:
-                        print(f"Attempt {attempt + 1} failed to click {description}: {str(e)}")
-                        if attempt == max_retries - 1:
-                            raise
-                        time.sleep(2)
-                return False
-            
-            # Click menu button
-            click_with_retry(".btn-menu-header", "menu button")
-            
-            # Wait for menu to expand
-            time.sleep(2)
-            
-            # Click Reports menu item
-            click_with_retry(
-                ".bbr-menu-item:nth-child(4) > .bbr-menu-item__link",
-                "reports menu"
-            )
-            time.sleep(2)
-            
-            # Click Sales Report option
-            click_with_retry(
-                ".bbr-menu-item:nth-child(1) > .bbr-menu-item__link",
-                "sales report"
-            )
-            time.sleep(2)
-            
-            print("Successfully navigated to sales report")
-            
+            self.routed_report = None
+            route = ROUTES.get(self.base_url, report_type)
+            if route:
+                # The menu is walked from wherever the session was, not from the bad route's page
+                previous_url = self.driver.current_url
+                if self.open_report_route(route):
+                    self.routed_report = report_type
+                    print(f"Navigated to {report_type} report through {route}")
+                    return
+                print(f"Direct route to {report_type} report failed, using the menu")
+                ROUTES.forget(self.base_url, report_type)
+                self.frames.invalidate()
+                self.driver.get(previous_url)
+            self.navigate_by_menu(report_type)
+            print(f"Successfully navigated to {report_type} report")
+
         except Exception as e:
             print(f"Navigation failed: {str(e)}")
             raise
-    def navigate_to_inventory_report(self):
-        """Navigate to sales inventory section"""
+
+    def open_report_route(self, route: str) -> bool:
+        """Load a report page directly; false when it did not come up as a report page"""
         try:
-            # Wait for page to load after login
-            time.sleep(3)
-            
-            def click_with_retry(selector, description, max_retries=3):
-                """Helper function to implement click with retry mechanism"""
-                for attempt in range(max_retries):
-                    try:
-                        element = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                        )
-                        time.sleep(1)
-                        element.click()
-                        return True
-                    except Exception as e:
-                        print(f"Attempt {attempt + 1} failed to click {description}: {str(e)}")
-                        if attempt == max_retries - 1:
-                            raise
-                        time.sleep(2)
+            self.frames.invalidate()
+            self.driver.get(route)
+            self.waiter.settle('navigate.route_loaded', 2, document_ready(),
+                               element_present((By.TAG_NAME, "iframe")))
+            if not self.check_session_active() or not self.driver.find_elements(By.TAG_NAME, "iframe"):
                 return False
-            
-            # Click menu button
-            click_with_retry(".btn-menu-header", "menu button")
-            
-            # Wait for menu to expand
-            time.sleep(2)
-            
-            # Click Inventory Report option
-            click_with_retry(
-                ".bbr-menu-item:nth-child(2) > .bbr-menu-item__link",
-                "inventory report"
-            )
-            time.sleep(2)
-            
-            print("Successfully navigated to inventory report")
-            
+
+            # The home page has a frame too: only a report filter proves the route worked
+            report_filter = (By.CSS_SELECTOR, "vaadin-select.bbr-filter-fields.bbr-filter-select")
+            home_grid = (By.XPATH, "//div[@class='cell-text-align-left' and @title='Ventas']")
+            self.frames.frame(0)
+            self.waiter.settle('navigate.route_report', 2, document_ready(),
+                               lambda d: d.find_elements(*report_filter) or d.find_elements(*home_grid))
+            return bool(self.driver.find_elements(*report_filter))
         except Exception as e:
-            print(f"Navigation failed: {str(e)}")
-            raise
+            print(f"Error opening {route}: {str(e)}")
+            self.frames.invalidate()
+            return False
+
+    def forget_route(self):
+        """Drop the learned route the current report page was reached through"""
+        if self.routed_report:
+            print(f"Forgetting the direct route to the {self.routed_report} report")
+            ROUTES.forget(self.base_url, self.routed_report)
+            self.routed_report = None
+
+    def navigate_by_menu(self, report_type: str):
+        """Click through the portal menu to a report page and remember where it led"""
+        # Wait for page to load after login
+        self.frames.top()
+        self.waiter.settle('navigate.page_ready', 3, document_ready(),
+                           element_ready((By.CSS_SELECTOR, ".btn-menu-header")))
+        start_url = self.driver.current_url
+
+        # Click menu button, then each menu item once it is shown. A submenu item
+        # may match the same selector as the level above, so after the first
+        # level wait for the clicked item to be replaced rather than for the selector
+        self.click_with_retry(".btn-menu-header", "menu button")
+        clicked = None
+        for step in REPORT_MENUS[report_type]:
+            locator = (By.CSS_SELECTOR, step.selector)
+            if clicked is None:
+                self.waiter.settle('navigate.menu_expanded', 2, vaadin_idle(), element_ready(locator))
+            else:
+                self.waiter.settle('navigate.submenu_expanded', 2, vaadin_idle(),
+                                   replaced(clicked, locator), element_ready(locator))
+            frames = self.driver.find_elements(By.TAG_NAME, "iframe")
+            before = (self.driver.current_url, frames[0].get_attribute('src') if frames else None)
+            clicked = self.click_with_retry(step.selector, step.description)
+
+        # The shell already has an iframe: wait for the report to replace what it showed
+        self.waiter.settle(f'navigate.{report_type}_loaded', 2, frame_navigated(*before),
+                           document_ready(), vaadin_idle())
+        self.frames.invalidate()
+
+        # The route is only worth reusing when the menu actually changed the URL
+        route = self.driver.current_url
+        if route != start_url:
+            ROUTES.learn(self.base_url, report_type, route)
+
+    def click_with_retry(self, selector: str, description: str, max_retries: int = 3):
+        """Click an element, retrying while the menu is still being rendered, and return it"""
+        for attempt in range(max_retries):
+            try:
+                element = self.wait.until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                )
+                self.waiter.settle(f'navigate.{description}', 1,
+                                   element_ready((By.CSS_SELECTOR, selector)))
+                element.click()
+                return element
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed to click {description}: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(2)
+        return None
 
     def check_session_active(self):
         """Check if session is still active by looking for back-home element"""
         try:
-            self.driver.switch_to.default_content()
+            self.frames.top()
             back_home = self.driver.find_elements(By.CSS_SELECTOR, ".back-home")
             if back_home:
                 print("Session expired, detected back-home element")
@@ -376,16 +495,9 @@ class FEMSAAutomation:
         try:
             self.login()
             
-            # Map of methods to their navigation functions
-            navigation_map = {
-                'get_dropdown_options': self.navigate_to_sales_report,
-                'select_dropdown_option': self.navigate_to_sales_report,
-                # Add other method mappings as needed
-            }
-            
-            # Execute the appropriate navigation function
-            if target_method in navigation_map:
-                navigation_map[target_method]()
+            # Methods that run on a report page go straight back to it
+            if target_method in ('get_dropdown_options', 'select_dropdown_option'):
+                self.navigate_to_report(self.current_report_type or 'ventas')
                 print(f"Successfully navigated back to previous state for {target_method}")
                 return True
             return False
@@ -393,6 +505,7 @@ class FEMSAAutomation:
             print(f"Error restarting session: {str(e)}")
             return False
 
+    @traced('get_dropdown_options')
     def get_dropdown_options(self):
         """Retrieve all available options from the dropdown with session handling"""
         max_retries = 3
@@ -407,8 +520,7 @@ class FEMSAAutomation:
                         raise Exception("Failed to restart session")
                 
                 # Switch to frame and proceed with dropdown options
-                self.driver.switch_to.default_content()
-                self.driver.switch_to.frame(0)
+                self.frames.frame(0)
                 
                 # Find and click the select element to open dropdown
                 select_element = self.wait.until(
@@ -418,43 +530,28 @@ class FEMSAAutomation:
                     ))
                 )
                 select_element.click()
-                time.sleep(2)
+                self.waiter.settle('dropdown.opened', 2, vaadin_idle(), element_present((By.CSS_SELECTOR, "vaadin-item")))
 
-                # Get all vaadin-items
-                items = self.wait.until(
-                    EC.presence_of_all_elements_located((
-                        By.CSS_SELECTOR,
-                        "vaadin-item"
-                    ))
-                )
-
-                # Store options information
-                self.available_options = []
-                for item in items:
-                    try:
-                        label = item.get_attribute('label')
-                        value = item.get_attribute('value')
-                        self.available_options.append({
-                            'label': label,
-                            'value': value,
-                            'element': item
-                        })
-                        print(f"Found option: {label} (value: {value})")
-                    except:
-                        continue
-
-                # Close dropdown by clicking outside
-                self.driver.execute_script("arguments[0].click();", select_element)
+                # Read every label/value and close the dropdown in one round-trip;
+                # only plain values are kept so later steps never hold stale elements
+                self.available_options = select_options(self.driver, select_element)
+                if not self.available_options:
+                    raise Exception("Dropdown opened without any options")
+                for option in self.available_options:
+                    print(f"Found option: {option['label']} (value: {option['value']})")
                 
                 return self.available_options
 
             except Exception as e:
                 print(f"Error in attempt {retry_count + 1}: {str(e)}")
+                self.frames.invalidate()
+                self.forget_route()
                 retry_count += 1
                 if retry_count == max_retries:
                     raise Exception(f"Failed to get dropdown options after {max_retries} attempts")
                 time.sleep(2)  # Wait before retrying
 
+    @traced('select_dropdown_option')
     def select_dropdown_option(self, index):
         """Select dropdown option by index with session handling"""
         max_retries = 3
@@ -468,16 +565,33 @@ class FEMSAAutomation:
                     if not self.restart_session('select_dropdown_option'):
                         raise Exception("Failed to restart session")
                 
-                self.driver.switch_to.default_content()
-                self.driver.switch_to.frame(0)
-                time.sleep(2)
+                self.frames.frame(0)
+                self.waiter.settle('dropdown.select_ready', 2, vaadin_idle(), element_ready(
+                    (By.CSS_SELECTOR, "vaadin-select.bbr-filter-fields.bbr-filter-select")))
                 
                 if not self.available_options:
                     self.get_dropdown_options()
 
                 if 0 <= index < len(self.available_options):
-                    # Rest of the existing select_dropdown_option code...
-                    # [Previous implementation remains the same]
+                    # Open the dropdown and pick the item by its value
+                    option = self.available_options[index]
+                    select_element = self.wait.until(
+                        EC.presence_of_element_located((
+                            By.CSS_SELECTOR,
+                            "vaadin-select.bbr-filter-fields.bbr-filter-select"
+                        ))
+                    )
+                    select_element.click()
+                    self.waiter.settle('dropdown.reopened', 2, vaadin_idle(), element_present(
+                        (By.CSS_SELECTOR, f"vaadin-item[value='{option['value']}']")))
+                    if not select_item(self.driver, option['value']):
+                        raise Exception(f"Option {option['label']} (value: {option['value']}) is not rendered")
+                    self.waiter.settle('dropdown.selected', 2, vaadin_idle(), lambda d: d.execute_script(
+                        "return arguments[0].value;", select_element) == option['value'])
+                    selected = self.driver.execute_script("return arguments[0].value;", select_element)
+                    if selected != option['value']:
+                        raise Exception(f"Dropdown holds {selected!r} instead of {option['value']!r}")
+                    print(f"Selected option: {option['label']} (value: {option['value']})")
                     return True
                 else:
                     print(f"Invalid index {index}. Available options: 0-{len(self.available_options)-1}")
@@ -485,6 +599,8 @@ class FEMSAAutomation:
 
             except Exception as e:
                 print(f"Error in attempt {retry_count + 1}: {str(e)}")
+                self.frames.invalidate()
+                self.forget_route()
                 retry_count += 1
                 if retry_count == max_retries:
                     raise Exception(f"Failed to select dropdown option after {max_retries} attempts")
@@ -502,13 +618,14 @@ class FEMSAAutomation:
         
         return start_date.strftime("%Y-%m-%d"), reference_date_str
 
-    def set_date_range(self):
-        """Set the date range in the date pickers with date format conversion"""
+    @traced('set_date_range')
+    def set_date_range(self) -> DateRangeResult:
+        """Set both date pickers and read them back in a single script round-trip"""
         try:
             # Switch to the appropriate frame
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(0)
-            time.sleep(2)
+            self.frames.frame(0)
+            self.waiter.settle('date_range.pickers_ready', 2, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, "vaadin-date-picker.bbr-filter-fields")))
             
             print("Starting date range setting process...")
             start_date_orig, end_date_orig = self.get_date_range(self.sales_dates['fecha'])
@@ -520,113 +637,93 @@ class FEMSAAutomation:
             print(f"Converted dates - Start: {start_date} (from {start_date_orig})")
             print(f"                  End: {end_date_orig} ")
 
-            # Find date picker containers
-            print("Locating date picker fields...")
-            start_picker = self.wait.until(
-                EC.presence_of_element_located((
-                    By.CSS_SELECTOR,
-                    "vaadin-date-picker.bbr-filter-fields:first-of-type"
-                ))
-            )
-            
-            end_picker = self.wait.until(
-                EC.presence_of_element_located((
-                    By.CSS_SELECTOR,
-                    "vaadin-date-picker.bbr-filter-fields:nth-of-type(2)"
-                ))
-            )
-
-            # JavaScript for setting dates with proper format
-            set_date_script = """
-            arguments[0].value = arguments[1];
-            arguments[0].dispatchEvent(new CustomEvent('value-changed', {
-                detail: { value: arguments[1] },
-                bubbles: true,
-                composed: true
-            }));
-            """
-
-            # Set start date
-            print(f"Setting start date to {start_date}")
-            self.driver.execute_script(set_date_script, start_picker, start_date)
-            time.sleep(1)
-
-            # Set end date
-            print(f"Setting end date to {end_date_orig}")
-            self.driver.execute_script(set_date_script, end_picker, end_date_orig)
-            time.sleep(1)
-
-            print(f"Completed date range setting - Start: {start_date}, End: {end_date_orig}")
-
-            # Verify the values were set
-            start_value = self.driver.execute_script("return arguments[0].value;", start_picker)
-            end_value = self.driver.execute_script("return arguments[0].value;", end_picker)
-            
-            print(f"Verification - Start date: {start_value}, End date: {end_value}")
-            
-            if start_value != start_date or end_value != end_date_orig:
-                print("Warning: Date values don't match expected values.")
-                print(f"Expected: {start_date} to {end_date_orig}")
-                print(f"Got: {start_value} to {end_value}")
+            # Set both pickers, wait for the Vaadin round-trip and read them back
+            outcome = set_pickers(self.driver, "vaadin-date-picker.bbr-filter-fields",
+                                  [start_date, end_date_orig], settings.WAIT_MAX)
+            values = list(outcome['values']) + [None, None]
+            result = DateRangeResult(start_date, end_date_orig, values[0], values[1],
+                                     outcome['idle'], outcome['error'])
+            
+            print(f"Verification - Start date: {result.start}, End date: {result.end}")
+            if not result.idle:
+                print(f"Vaadin still busy after {settings.WAIT_MAX}s setting the date range")
+            return result
             
         except Exception as e:
             print(f"Error setting date range: {str(e)}")
             raise
+
+    def apply_date_range(self, attempts: int = 2):
+        """Set the date range, retrying on a mismatch and failing rather than downloading the wrong period"""
+        for attempt in range(attempts):
+            result = self.set_date_range()
+            if result.ok:
+                return result
+            print(f"Date range mismatch (attempt {attempt + 1}/{attempts}): expected "
+                  f"{result.expected_start} to {result.expected_end}, got {result.start} to {result.end}"
+                  + (f" ({result.error})" if result.error else ""))
+        raise Exception(f"Date range could not be set to {result.expected_start} - {result.expected_end}")
+
+    @traced('filter_button')
     def filter_button(self):
         """Click the filter button to generate a second report on the second iteration"""
         try:
-            time.sleep(3)
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(0)
-            
+            self.frames.frame(0)
+            self.waiter.settle('filter.ready', 3, element_ready((By.ID, "btn-filter")), overlay_closed())
  
             # Click filter button
             filter_button = self.wait.until(
                 EC.element_to_be_clickable((By.ID, "btn-filter"))
             )
             filter_button.click()
-            time.sleep(2)
             
-            # Wait for download to complete
-            time.sleep(5)
+            # Wait for the filter panel to come back
+            self.waiter.settle('filter.done', 7, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, "vaadin-select.bbr-filter-fields.bbr-filter-select")))
             print(f"Clicked filter button successfully")
 
         except Exception as e:
             print(f"Error downloading report: {str(e)}")
             raise
+    @traced('download_report')
     def download_report(self, iteration: int):
         """Generate and download the report"""
         try:
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(0)
+            # The previous unit's link stays up until the new report replaces it
+            link_locator = (By.PARTIAL_LINK_TEXT, "venta_")
+            self.frames.top()
+            seen_links = link_hrefs(self.driver, link_locator)
+            self.frames.frame(0)
             
             # Click generate button
             generate_button = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "vaadin-button.filter-button"))
             )
             generate_button.click()
-            time.sleep(3)
+            self.waiter.settle('sales.generated', 3, vaadin_idle(), element_ready((By.ID, "btn-download")))
             
             # Click download button
             download_button = self.wait.until(
                 EC.element_to_be_clickable((By.ID, "btn-download"))
             )
             download_button.click()
-            time.sleep(2)
+            self.waiter.settle('sales.download_menu', 2, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, ".vaadin-menu-item:nth-child(3) > .link-button")))
             
             # Select "Descargar reporte" option in zip format!
             download_report = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, ".vaadin-menu-item:nth-child(3) > .link-button"))
             )
             download_report.click()
-            time.sleep(2)
+            self.waiter.settle('sales.format_dialog', 2, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, "vaadin-radio-button:nth-child(2) > label")))
             
             # Select CSV format
             csv_option = self.wait.until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "vaadin-radio-button:nth-child(2) > label"))
             )
             csv_option.click()
-            time.sleep(2)
+            self.waiter.settle('sales.csv_selected', 2, vaadin_idle(), element_ready((By.CSS_SELECTOR, ".filter-apply-button")))
             
             # Click apply button
             apply_button = self.wait.until(
@@ -635,36 +732,41 @@ class FEMSAAutomation:
             apply_button.click()
             
             # Handle the final CSV download
-            self.driver.switch_to.default_content()
-            time.sleep(5)
+            self.frames.top()
+            self.waiter.settle('sales.link_ready', 5, new_link(link_locator, seen_links))
             
             # Find and click the CSV download link
-            csv_link = self.wait.until(
-                EC.presence_of_element_located((By.PARTIAL_LINK_TEXT, "venta_"))
-            )
-            csv_link.click()
-            
-            # Wait for download to complete
-            time.sleep(5)
+            csv_link = self.wait.until(new_link(link_locator, seen_links))
+            if self.fetcher:
+                self.pending_download = self.fetch_report(csv_link)
+            else:
+                # Click and wait for download to complete
+                self.last_download = self.capture_download(csv_link.click, ('.zip',))
             print(f"Report {iteration + 1} downloaded successfully")
 
         except Exception as e:
             print(f"Error downloading report: {str(e)}")
             raise
+    @traced('download_report2')
     def download_report2(self, iteration: int):
         """Generate and download the inventory report"""
         try:
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(0)
+            # The previous unit's link stays up until the new report replaces it
+            link_locator = (By.XPATH, "//a[contains(@href,'detalleinventario_')]")
+            self.frames.top()
+            seen_links = link_hrefs(self.driver, link_locator)
+            self.frames.frame(0)
             
             print("Waiting for generate button...")
             generate_button = WebDriverWait(self.driver, 30).until(
                 EC.visibility_of_element_located((By.CSS_SELECTOR, "vaadin-button.filter-button"))
             )
-            time.sleep(2)
+            self.waiter.settle('inventory.generate_ready', 2, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, "vaadin-button.filter-button")))
             self.driver.execute_script("arguments[0].click();", generate_button)
             print("Generate button clicked")
-            time.sleep(10)
+            self.waiter.settle('inventory.generated', 10, vaadin_idle(), element_ready((By.ID, "btn-download")),
+                               max_wait=60)
             
             print("Waiting for download button...")
             download_button = WebDriverWait(self.driver, 30).until(
@@ -672,7 +774,8 @@ class FEMSAAutomation:
             )
             self.driver.execute_script("arguments[0].click();", download_button)
             print("Download button clicked")
-            time.sleep(5)
+            self.waiter.settle('inventory.download_menu', 5, vaadin_idle(), element_present(
+                (By.CSS_SELECTOR, "div[role='menuitem']:first-child")))
             
             print("Selecting download report option...")
             download_report = WebDriverWait(self.driver, 30).until(
@@ -680,7 +783,8 @@ class FEMSAAutomation:
             )
             self.driver.execute_script("arguments[0].click();", download_report)
             print("Download report option clicked")
-            time.sleep(5)
+            self.waiter.settle('inventory.format_dialog', 5, vaadin_idle(), element_present(
+                (By.CSS_SELECTOR, "vaadin-radio-button[value='CSV'] label")))
             
             print("Selecting CSV option...")
             csv_option = WebDriverWait(self.driver, 30).until(
@@ -688,7 +792,8 @@ class FEMSAAutomation:
             )
             self.driver.execute_script("arguments[0].click();", csv_option)
             print("CSV option clicked")
-            time.sleep(3)
+            self.waiter.settle('inventory.csv_selected', 3, vaadin_idle(), element_ready(
+                (By.CSS_SELECTOR, "vaadin-button.filter-apply-button")))
             
             print("Clicking apply button...")
             apply_button = WebDriverWait(self.driver, 30).until(
@@ -697,22 +802,24 @@ class FEMSAAutomation:
             self.driver.execute_script("arguments[0].click();", apply_button)
             print("Apply button clicked")
             
-            self.driver.switch_to.default_content()
-            time.sleep(15)
+            self.frames.top()
+            self.waiter.settle('inventory.link_ready', 15, new_link(link_locator, seen_links), max_wait=60)
             
             print("Looking for CSV download link...")
             try:
-                csv_link = WebDriverWait(self.driver, 45).until(
-                    EC.presence_of_element_located((By.XPATH, "//a[contains(@href,'detalleinventario_')]"))
-                )
-                self.driver.execute_script("arguments[0].click();", csv_link)
-                print("CSV link clicked")
+                csv_link = WebDriverWait(self.driver, 45).until(new_link(link_locator, seen_links))
             except Exception as e:
                 print("Error finding CSV link:", str(e))
                 print("Current page source:", self.driver.page_source)
                 raise
             
-            time.sleep(15)
+            if self.fetcher:
+                self.pending_download = self.fetch_report(csv_link)
+            else:
+                self.last_download = self.capture_download(
+                    lambda: self.driver.execute_script("arguments[0].click();", csv_link), ('.csv',)
+                )
+                print("CSV link clicked")
             print(f"Inventory report {iteration + 1} download process completed")
 
         except Exception as e:
@@ -720,6 +827,30 @@ class FEMSAAutomation:
             print("Current URL:", self.driver.current_url)
             print("Current page source:", self.driver.page_source)
             raise
+    def capture_download(self, click: Callable[[], Any], extensions: Tuple[str, ...]) -> str:
+        """Trigger a download with `click` and return the path of the finished file"""
+        if self.download_tracker:
+            self.download_tracker.begin()
+            click()
+            return self.download_tracker.wait(settings.DOWNLOAD_TIMEOUT).path
+
+        with DownloadWatcher(self.get_download_path(), extensions) as watcher:
+            click()
+            return watcher.wait(settings.DOWNLOAD_TIMEOUT)
+
+    def fetch_report(self, link) -> Future:
+        """Start streaming the file behind `link` using the browser's session"""
+        url = link.get_attribute('href')
+        headers = {'User-Agent': self.driver.execute_script("return navigator.userAgent;")}
+        print(f"Fetching {url} over HTTP")
+        return self.fetcher.submit(url, self.get_download_path(), session_cookies(self.driver), headers)
+
+    def wait_for_processing(self):
+        """Wait for deferred file processing and surface the first failure"""
+        jobs, self.processing_jobs = self.processing_jobs, []
+        for job in jobs:
+            job.result()
+
     def convert_date_format(self, date_str):
         """Convert date from DD-MM-YYYY to YYYY-MM-DD format"""
         try:
@@ -730,11 +861,12 @@ class FEMSAAutomation:
         except Exception as e:
             print(f"Error converting date format: {str(e)}")
             return date_str    
+    @traced('scrape_sales_dates')
     def scrape_sales_dates(self):
         try:
-            time.sleep(3)
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(0)
+            self.frames.top()
+            self.waiter.settle('login.home_ready', 3, document_ready(), element_present((By.TAG_NAME, "iframe")))
+            self.frames.frame(0)
             
             # Find content slots that contain Ventas and date info
             ventas_element = self.wait.until(
@@ -761,7 +893,7 @@ class FEMSAAutomation:
             
             print(f"Scraped dates - Fecha: {self.sales_dates['fecha']}, Ultima carga: {self.sales_dates['ultima_carga']}")
             
-            self.driver.switch_to.default_content()
+            self.frames.top()
             
         except Exception as e:
             print(f"Error scraping sales dates: {str(e)}")
@@ -790,84 +922,68 @@ class FEMSAAutomation:
         
         raise FileNotFoundError("No recently created zip files found")
 
-    def process_downloaded_files(self, iteration: int, report_type: str = 'ventas'):
+    @traced('process_downloaded_files')
+    def process_downloaded_files(self, iteration: int, report_type: str = 'ventas',
+                                 downloaded_path: Optional[str] = None):
         """
         Process downloaded files and rename according to client config
         
         Args:
             iteration: The current iteration number
             report_type: Type of report ('ventas' or 'inventario')
+            downloaded_path: Downloaded file, defaults to the last detected download
         """
+        # A direct fetch is still running: process it in the background once it lands
+        if downloaded_path is None and self.pending_download is not None:
+            fetch, self.pending_download = self.pending_download, None
+            self.processing_jobs.append(self.processing_executor.submit(
+                lambda: self.process_downloaded_files(iteration, report_type, fetch.result())
+            ))
+            print(f"Deferred processing of {report_type} files for iteration {iteration}")
+            return
+
+        downloaded_path = downloaded_path or self.last_download
         try:
-            # Get file naming patterns from database for the current client
-            file_patterns = self.db.execute_query("""
-                SELECT unidad_negocio_id, archivo_venta, archivo_inventario 
-                FROM cliente_unidad_negocio 
-                WHERE cliente_id = %s
-                ORDER BY unidad_negocio_id DESC
-            """, (self.client_info['id'],))
-            
-            if not file_patterns:
-                raise ValueError(f"No file patterns found for cliente_id={self.client_info['id']}")
-            
-            current_pattern = file_patterns[iteration]
-            patterns = {
-                'archivo_venta': current_pattern['archivo_venta'],
-                'archivo_inventario': current_pattern['archivo_inventario']
-            }
+            # File naming patterns were loaded once for the whole run
+            unit = self.units[iteration]
             
-            print(f"Processing {report_type} files for unidad_negocio_id {current_pattern['unidad_negocio_id']}")
-            print(f"Venta: {patterns['archivo_venta']}, Inventario: {patterns['archivo_inventario']}")
+            print(f"Processing {report_type} files for unidad_negocio_id {unit.unidad_negocio_id}")
+            print(f"Venta: {unit.archivo_venta}, Inventario: {unit.archivo_inventario}")
             
             date_str = self.sales_dates['fecha'].replace('-', '')
             zip_dir = self.get_download_path()
             extraction_dir = self.get_extraction_path()
             
             if report_type == 'ventas':
-                # Get the latest zip files from current iteration
-                latest_zips = self.get_latest_zip()
+                # Use the file that was seen arriving, scanning only as a fallback
+                latest_zips = [downloaded_path] if downloaded_path else self.get_latest_zip()
                 
                 for zip_path in latest_zips:
                     print(f"Processing ZIP file: {zip_path}")
+                    new_name = f"{unit.archivo_venta}{date_str}.csv"
                     
-                    # Create a temporary extraction directory for this specific zip
-                    temp_extraction_dir = os.path.join(extraction_dir, f'temp_{os.path.basename(zip_path)}')
-                    os.makedirs(temp_extraction_dir, exist_ok=True)
-                    
-                    try:
-                        # Extract only the latest zip to temporary directory
-                        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                            zip_ref.extractall(temp_extraction_dir)
-                        
-                        # Process files from temporary directory
-                        for file in os.listdir(temp_extraction_dir):
-                            if file.endswith('.csv') and 'venta' in file.lower():
-                                old_path = os.path.join(temp_extraction_dir, file)
-                                new_name = f"{patterns['archivo_venta']}{date_str}.csv"
-                                new_path = os.path.join(extraction_dir, new_name)
-                                
-                                print(f"Moving and renaming {file} to {new_name}")
-                                if os.path.exists(new_path):
-                                    os.remove(new_path)
-                                os.rename(old_path, new_path)
-                    finally:
-                        # Clean up temporary directory
-                        if os.path.exists(temp_extraction_dir):
-                            import shutil
-                            shutil.rmtree(temp_extraction_dir)
+                    # Stream only the venta CSV straight to its final name
+                    extracted = extract_members(
+                        zip_path,
+                        lambda name: name.endswith('.csv') and 'venta' in name.lower(),
+                        os.path.join(extraction_dir, new_name)
+                    )
+                    for file in extracted:
+                        print(f"Extracted {file} as {new_name}")
                         
             else:
                 # For inventory reports, handle the CSV directly
-                time.sleep(5)  # Wait for download to complete
-                
-                # Get the latest CSV file
-                csv_files = [f for f in os.listdir(zip_dir) if f.endswith('.csv')]
-                if csv_files:
-                    latest_csv = max(csv_files, key=lambda x: os.path.getctime(os.path.join(zip_dir, x)))
+                if downloaded_path:
+                    latest_csv = os.path.basename(downloaded_path)
+                else:
+                    # Get the latest CSV file
+                    csv_files = [f for f in os.listdir(zip_dir) if f.endswith('.csv')]
+                    latest_csv = max(csv_files, key=lambda x: os.path.getctime(os.path.join(zip_dir, x))) if csv_files else None
+                if latest_csv:
                     
                     if 'detalleinventario' in latest_csv.lower():
                         old_path = os.path.join(zip_dir, latest_csv)
-                        new_name = f"{patterns['archivo_inventario']}{date_str}.csv"
+                        new_name = f"{unit.archivo_inventario}{date_str}.csv"
                         new_path = os.path.join(extraction_dir, new_name)
                         
                         print(f"Moving and renaming {latest_csv} to {new_name}")
@@ -875,6 +991,7 @@ class FEMSAAutomation:
                             os.remove(new_path)
                         os.rename(old_path, new_path)
             
+            self.last_download = None
             print(f"Successfully processed {report_type} files for iteration {iteration}")
             
         except Exception as e:
@@ -882,55 +999,84 @@ class FEMSAAutomation:
             raise
     def close(self):
         """Close browser and database connections"""
-        if self.driver:
+        if self.fetcher:
+            self.fetcher.close()
+            self.processing_executor.shutdown(wait=True)
+        self.command_metrics.print_summary()
+        uninstrument(self.driver)
+        if active_recorder() is self.spans:
+            activate(None)
+        if self.owns_spans:
+            self.spans.close()
+            write_run_trace(self.spans.spans, self.cliente)
+        if self.driver and self.owns_driver:
             self.driver.quit()
-        self.db.close()
+        if self.parent is None:
+            self.db.close()
+
+OUTCOME_SUCCESS = 'success'
+OUTCOME_ALREADY_DONE = 'already_done'
+OUTCOME_STALE = 'stale_date'
+OUTCOME_FAILED = 'failed'
+OUTCOME_IN_PROGRESS = 'in_progress'
+
+def run_client(cliente: str, db: DatabaseConnector, driver: Optional[webdriver.Chrome] = None,
+               preflight: bool = True, spans: Optional[SpanRecorder] = None) -> str:
+    """
+    Run the full download flow for a single client and return its outcome.
+    Pass preflight=False when the client is already known to be pending, and
+    a SpanRecorder to collect the run's spans (e.g. for a batch timeline).
+    """
+    # Check if report was already generated today, before paying for a browser
+    if preflight and db.check_last_log_status(cliente):
+        print("Exiting: Report already generated successfully today")
+        db.close()
+        return OUTCOME_ALREADY_DONE
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <cliente>")
-        sys.exit(1)
-        
-    cliente = sys.argv[1]
-    
-    # Initialize database connection
-    db = DatabaseConnector(
-        host='localhost',
-        user='b2b_user',
-        password='OPjp%6kiyEfX',
-        database='python'
-    )
-    
     automation = None
     try:
         # Initialize automation
-        automation = FEMSAAutomation(cliente, db)
-        
-        # Check if report was already generated today
-        if automation.check_last_log_status():
-            print("Exiting: Report already generated successfully today")
-            sys.exit(0)
+        automation = FEMSAAutomation(cliente, db, driver, spans)
         
         # Run automation
         automation.login()
-
         
         # Check if scraped date is valid
         if not automation.check_date_validity():
             print("Exiting: Scraped date is too old")
-            sys.exit(1)
+            return OUTCOME_STALE
             
-        automation.generate_reports()
+        if not automation.generate_reports():
+            return OUTCOME_ALREADY_DONE
         
         print("Report generation completed successfully")
+        return OUTCOME_SUCCESS
         
+    except RunInProgress as e:
+        # Not done: either another process is on it or a dead run still holds its lease
+        print(f"Skipping: {str(e)}")
+        return OUTCOME_IN_PROGRESS
     except Exception as e:
         print(f"Error: {str(e)}")
-        if automation and automation.db:
-            automation.db.update_report_status(cliente, 'cruz verde', 0)
+        if automation and automation.run_id:
+            automation.db.update_report_status(cliente, 'cruz verde', 0, automation.run_id)
+        return OUTCOME_FAILED
     finally:
         if automation:
             automation.close()
 
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python script.py <cliente>")
+        sys.exit(1)
+        
+    cliente = sys.argv[1]
+    
+    # Initialize database connection
+    db = DatabaseConnector(**settings.DB_CONFIG)
+    
+    if run_client(cliente, db) == OUTCOME_STALE:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
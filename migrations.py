@@ -0,0 +1,87 @@
+"""Idempotent schema migrations for the log tables used by the automation"""
+from typing import List, NamedTuple, Tuple
+
+from database_connector import DatabaseConnector
+import settings
+
+
+class Migration(NamedTuple):
+    name: str
+    exists_query: str
+    exists_params: Tuple
+    statement: str
+
+
+INDEX_EXISTS = """
+    SELECT COUNT(*) AS n FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+"""
+
+
+COLUMN_EXISTS = """
+    SELECT COUNT(*) AS n FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+"""
+
+
+def index_migration(table: str, name: str, columns: Tuple[str, ...], unique: bool = False) -> Migration:
+    return Migration(
+        name=f"{table}.{name}",
+        exists_query=INDEX_EXISTS,
+        exists_params=(table, name),
+        statement=f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})",
+    )
+
+
+def column_migration(table: str, column: str, definition: str) -> Migration:
+    return Migration(
+        name=f"{table}.{column}",
+        exists_query=COLUMN_EXISTS,
+        exists_params=(table, column),
+        statement=f"ALTER TABLE {table} ADD COLUMN {column} {definition}",
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    # check_report_status: cliente/cadena equality plus a created_at range
+    index_migration('log_script_descarga_cadena_cliente', 'idx_cliente_cadena_created',
+                    ('cliente', 'cadena', 'created_at')),
+    # check_last_log_status: cliente/cadena equality, updated_at range, estado filter
+    index_migration('log_script_descarga_cadena_cliente', 'idx_cliente_cadena_updated_estado',
+                    ('cliente', 'cadena', 'updated_at', 'estado')),
+    index_migration('log_script_carga_cadena_cliente', 'idx_cliente_cadena_updated_estado',
+                    ('cliente', 'cadena', 'updated_at', 'estado')),
+    # Run ledger: one run per client, chain and report date
+    column_migration('log_script_descarga_cadena_cliente', 'fecha', 'DATE NULL AFTER cadena'),
+    index_migration('log_script_descarga_cadena_cliente', 'uq_cliente_cadena_fecha',
+                    ('cliente', 'cadena', 'fecha'), unique=True),
+]
+
+
+def apply_migrations(db: DatabaseConnector) -> List[str]:
+    """Apply every migration that is not in place yet and return their names"""
+    applied = []
+    for migration in MIGRATIONS:
+        result = db.execute_query(migration.exists_query, migration.exists_params)
+        if result is None:
+            raise RuntimeError(f"Could not check migration {migration.name}")
+        if result[0]['n']:
+            print(f"Already applied: {migration.name}")
+            continue
+        if not db.execute_insert(migration.statement):
+            raise RuntimeError(f"Failed to apply migration {migration.name}")
+        print(f"Applied: {migration.name}")
+        applied.append(migration.name)
+    return applied
+
+
+def main():
+    db = DatabaseConnector(**settings.DB_CONFIG)
+    try:
+        apply_migrations(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""Local stand-in for the FEMSA B2B portal, for offline end-to-end runs and benchmarks"""
+import argparse
+import csv
+import io
+import json
+import secrets
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+SESSION_COOKIE = 'FEMSASESSION'
+
+LANDING_PAGE = """<!doctype html>
+<html><head><title>B2B Portal</title></head>
+<body>
+  <select id="pais"><option>Argentina</option><option>Chile</option><option>Peru</option></select>
+  <select id="uneg"><option>Bebidas</option><option>Salud</option></select>
+  <button class="btn" onclick="location.href='/auth'">Ingresar</button>
+</body></html>
+"""
+
+AUTH_PAGE = """<!doctype html>
+<html><head><title>Login</title></head>
+<body>
+  <form method="post" action="/auth">
+    <input id="username" name="username">
+    <input id="password" name="password" type="password">
+    <input id="kc-login" type="submit" value="Ingresar">
+  </form>
+</body></html>
+"""
+
+EXPIRED_PAGE = """<!doctype html>
+<html><head><title>Sesion expirada</title></head>
+<body><p>Su sesion ha expirado</p><a class="back-home" href="/">Volver al inicio</a></body></html>
+"""
+
+# Top-level application shell; reports are rendered in frame 0
+APP_PAGE = """<!doctype html>
+<html><head><title>B2B Portal</title>
+<style>
+  .bbr-menu:not([open]) { display: none; }
+  #notifications a { display: block; }
+</style></head>
+<body>
+  <header>
+    <button class="btn-menu-header">Menu</button>
+    <button id="btn-logout" onclick="location.href='/logout'">Salir</button>
+  </header>
+  <nav class="bbr-menu"><ul id="menu-list"></ul></nav>
+  <div id="notifications"></div>
+  <iframe id="app-frame" src="/app/frame/__ROUTE__" width="1200" height="800"></iframe>
+<script>
+  const MENUS = {
+    top: [['Inicio', 'home'], ['Inventario', 'inventory'], ['Comercial', null], ['Reportes', 'reports']],
+    reports: [['Ventas', 'sales'], ['Otros', null]]
+  };
+  const nav = document.querySelector('.bbr-menu');
+  const list = document.getElementById('menu-list');
+
+  function renderMenu(name) {
+    list.innerHTML = '';
+    MENUS[name].forEach(([label, target]) => {
+      const item = document.createElement('li');
+      item.className = 'bbr-menu-item';
+      const link = document.createElement('a');
+      link.className = 'bbr-menu-item__link';
+      link.href = '#';
+      link.textContent = label;
+      link.addEventListener('click', (event) => {
+        event.preventDefault();
+        if (target === 'reports') {
+          renderMenu('reports');
+        } else if (target) {
+          nav.removeAttribute('open');
+          history.pushState({}, '', '/app/reports/' + target);
+          document.getElementById('app-frame').src = '/app/frame/' + target;
+        }
+      });
+      item.appendChild(link);
+      list.appendChild(item);
+    });
+  }
+
+  document.querySelector('.btn-menu-header').addEventListener('click', () => {
+    renderMenu('top');
+    nav.setAttribute('open', '');
+  });
+
+  window.femsaShowDownload = async function (kind, unit, from, to) {
+    const params = new URLSearchParams({kind: kind, unit: unit, from: from || '', to: to || ''});
+    const response = await fetch('/api/report?' + params.toString());
+    const file = await response.json();
+    const box = document.getElementById('notifications');
+    box.innerHTML = '';
+    const link = document.createElement('a');
+    link.href = file.url;
+    link.textContent = file.name;
+    box.appendChild(link);
+  };
+</script>
+</body></html>
+"""
+
+HOME_FRAME = """<!doctype html>
+<html><body>
+  <div class="grid">
+    <div class="cell-text-align-left" title="Ventas">Ventas</div>
+    <vaadin-grid-cell-content slot="vaadin-grid-cell-content-5"><div title="__FECHA__">__FECHA__</div></vaadin-grid-cell-content>
+    <vaadin-grid-cell-content slot="vaadin-grid-cell-content-6"><div title="__ULTIMA__">__ULTIMA__</div></vaadin-grid-cell-content>
+  </div>
+</body></html>
+"""
+
+REPORT_FRAME = """<!doctype html>
+<html><head>
+<style>
+  vaadin-select, vaadin-button, vaadin-date-picker, vaadin-radio-button {
+    display: inline-block; padding: 4px 8px; margin: 2px; border: 1px solid #888; cursor: pointer;
+  }
+  vaadin-item { display: block; padding: 4px; cursor: pointer; }
+  vaadin-select-overlay:not([opened]), vaadin-context-menu-overlay:not([opened]),
+  vaadin-dialog-overlay:not([opened]) { display: none; }
+  [hidden] { display: none !important; }
+</style></head>
+<body>
+  <div class="filters">
+    <vaadin-select class="bbr-filter-fields bbr-filter-select">Unidad de negocio</vaadin-select>
+    __DATE_PICKERS__
+    <vaadin-button class="filter-button">Generar</vaadin-button>
+  </div>
+  <vaadin-select-overlay></vaadin-select-overlay>
+  <div id="results" hidden>
+    <vaadin-button id="btn-filter">Filtros</vaadin-button>
+    <vaadin-button id="btn-download">Descargar</vaadin-button>
+  </div>
+  <vaadin-context-menu-overlay>
+    <div class="vaadin-menu-item" role="menuitem"><span class="link-button">Descargar reporte</span></div>
+    <div class="vaadin-menu-item" role="menuitem"><span class="link-button">Descargar detalle</span></div>
+    <div class="vaadin-menu-item" role="menuitem"><span class="link-button">Descargar reporte</span></div>
+  </vaadin-context-menu-overlay>
+  <vaadin-dialog-overlay>
+    <div class="formats">
+      <vaadin-radio-button value="ZIP"><label>ZIP</label></vaadin-radio-button>
+      <vaadin-radio-button value="CSV"><label>CSV</label></vaadin-radio-button>
+    </div>
+    <vaadin-button class="filter-apply-button">Aplicar</vaadin-button>
+  </vaadin-dialog-overlay>
+<script>
+  const KIND = '__KIND__';
+  const UNITS = __UNITS__;
+  const LATENCY_MS = __LATENCY_MS__;
+  const GENERATE_MS = __GENERATE_MS__;
+
+  // Minimal Vaadin Flow client: busy while a simulated server round-trip is in flight
+  let pending = 0;
+  window.Vaadin = {Flow: {clients: {app: {isActive: () => pending > 0}}}};
+  function serverCall(delay, callback) {
+    pending++;
+    setTimeout(() => { pending--; if (callback) { callback(); } }, delay);
+  }
+
+  const select = document.querySelector('vaadin-select');
+  const selectOverlay = document.querySelector('vaadin-select-overlay');
+  const results = document.getElementById('results');
+  const menu = document.querySelector('vaadin-context-menu-overlay');
+  const dialog = document.querySelector('vaadin-dialog-overlay');
+  select.value = UNITS.length ? UNITS[0].value : '';
+
+  select.addEventListener('click', () => {
+    if (selectOverlay.hasAttribute('opened')) {
+      selectOverlay.removeAttribute('opened');
+      selectOverlay.innerHTML = '';
+      return;
+    }
+    serverCall(LATENCY_MS, () => {
+      UNITS.forEach((unit) => {
+        const item = document.createElement('vaadin-item');
+        item.setAttribute('label', unit.label);
+        item.setAttribute('value', unit.value);
+        item.textContent = unit.label;
+        item.addEventListener('click', () => {
+          select.value = unit.value;
+          select.textContent = unit.label;
+          selectOverlay.removeAttribute('opened');
+          selectOverlay.innerHTML = '';
+          serverCall(LATENCY_MS);
+        });
+        selectOverlay.appendChild(item);
+      });
+      selectOverlay.setAttribute('opened', '');
+    });
+  });
+  select.addEventListener('change', () => serverCall(LATENCY_MS));
+
+  document.querySelectorAll('vaadin-date-picker').forEach((picker) => {
+    picker.addEventListener('value-changed', () => serverCall(LATENCY_MS));
+  });
+
+  document.querySelector('vaadin-button.filter-button').addEventListener('click', () => {
+    results.hidden = true;
+    serverCall(GENERATE_MS, () => { results.hidden = false; });
+  });
+  document.getElementById('btn-filter').addEventListener('click', () => {
+    serverCall(LATENCY_MS, () => { results.hidden = true; });
+  });
+  document.getElementById('btn-download').addEventListener('click', () => {
+    serverCall(LATENCY_MS, () => menu.setAttribute('opened', ''));
+  });
+  menu.querySelectorAll('.vaadin-menu-item').forEach((item) => {
+    item.addEventListener('click', () => {
+      menu.removeAttribute('opened');
+      serverCall(LATENCY_MS, () => dialog.setAttribute('opened', ''));
+    });
+  });
+  dialog.querySelectorAll('vaadin-radio-button').forEach((radio) => {
+    radio.addEventListener('click', () => {
+      dialog.querySelectorAll('vaadin-radio-button').forEach((r) => r.removeAttribute('checked'));
+      radio.setAttribute('checked', '');
+    });
+  });
+  document.querySelector('vaadin-button.filter-apply-button').addEventListener('click', () => {
+    dialog.removeAttribute('opened');
+    const pickers = document.querySelectorAll('vaadin-date-picker');
+    const from = pickers.length ? pickers[0].value : '';
+    const to = pickers.length > 1 ? pickers[1].value : '';
+    serverCall(GENERATE_MS, () => parent.femsaShowDownload(KIND, select.value, from, to));
+  });
+</script>
+</body></html>
+"""
+
+DATE_PICKERS = """<span class="dates">
+      <vaadin-date-picker class="bbr-filter-fields">Desde</vaadin-date-picker>
+      <vaadin-date-picker class="bbr-filter-fields">Hasta</vaadin-date-picker>
+    </span>"""
+
+
+class MockPortal:
+    """
+    Serve the DOM contracts FEMSAAutomation relies on: login form, menu,
+    report frames with Vaadin-like widgets, session expiry and generated
+    zip/CSV report files.
+
+    Args:
+        host, port: Address to bind; port 0 picks a free port
+        units: Number of business units offered in the report dropdown
+        latency: Seconds added to every HTTP response and UI round-trip
+        generate_delay: Seconds a report takes to generate
+        rows: Data rows per generated report file
+        session_ttl: Seconds before a session expires (None never expires)
+        report_date: Date shown on the home grid, defaults to yesterday
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, units: int = 1,
+                 latency: float = 0.0, generate_delay: float = 0.5, rows: int = 1000,
+                 session_ttl: Optional[float] = None, report_date: Optional[datetime] = None):
+        self.units = [{'label': f"Unidad {i + 1}", 'value': str(100 + i)} for i in range(units)]
+        self.latency = latency
+        self.generate_delay = generate_delay
+        self.rows = rows
+        self.session_ttl = session_ttl
+        self.report_date = report_date or (datetime.now() - timedelta(days=1))
+        self.sessions: Dict[str, float] = {}
+        self.files: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockPortal':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-portal', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # Sessions
+
+    def new_session(self) -> str:
+        token = secrets.token_hex(16)
+        with self._lock:
+            self.sessions[token] = time.time()
+        return token
+
+    def session_valid(self, token: Optional[str]) -> bool:
+        with self._lock:
+            created = self.sessions.get(token) if token else None
+        if created is None:
+            return False
+        return self.session_ttl is None or time.time() - created < self.session_ttl
+
+    def end_session(self, token: Optional[str]):
+        with self._lock:
+            self.sessions.pop(token, None)
+
+    # Report payloads
+
+    def build_report(self, kind: str, unit: str, date_from: str, date_to: str) -> Tuple[str, str]:
+        """Generate a report file and return its name and download URL"""
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        fecha = self.report_date.strftime('%Y-%m-%d')
+        if kind == 'sales':
+            writer.writerow(['fecha', 'unidad', 'sku', 'local', 'unidades', 'monto'])
+            for i in range(self.rows):
+                writer.writerow([fecha, unit, f"SKU{i % 500:05d}", f"L{i % 80:03d}", i % 17, (i * 37) % 10000])
+            csv_name = f"venta_{unit}_{stamp}.csv"
+            payload = io.BytesIO()
+            with zipfile.ZipFile(payload, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(csv_name, buffer.getvalue())
+                archive.writestr('leeme.txt', f"Reporte de ventas {date_from} - {date_to}\n")
+            name, data = f"venta_{unit}_{stamp}.zip", payload.getvalue()
+        else:
+            writer.writerow(['fecha', 'unidad', 'sku', 'local', 'stock'])
+            for i in range(self.rows):
+                writer.writerow([fecha, unit, f"SKU{i % 500:05d}", f"L{i % 80:03d}", (i * 13) % 400])
+            name, data = f"detalleinventario_{unit}_{stamp}.csv", buffer.getvalue().encode()
+        with self._lock:
+            self.files[name] = (name, data)
+        return name, f"/files/{name}"
+
+    def _handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def session_token(self) -> Optional[str]:
+                for part in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = part.strip().partition('=')
+                    if name == SESSION_COOKIE:
+                        return value
+                return None
+
+            def send_body(self, body: bytes, content_type: str = 'text/html; charset=utf-8',
+                          status: int = 200, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+                self.send_response(302)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+
+            def do_GET(self):
+                if portal.latency:
+                    time.sleep(portal.latency)
+                url = urlparse(self.path)
+                path = url.path
+                if path == '/':
+                    return self.send_body(LANDING_PAGE.encode())
+                if path == '/auth':
+                    return self.send_body(AUTH_PAGE.encode())
+                if path == '/logout':
+                    portal.end_session(self.session_token())
+                    return self.redirect('/', {'Set-Cookie': f"{SESSION_COOKIE}=; Path=/; Max-Age=0"})
+
+                if not portal.session_valid(self.session_token()):
+                    if path.startswith('/files/'):
+                        return self.send_body(b'Forbidden', 'text/plain', 403)
+                    return self.send_body(EXPIRED_PAGE.encode())
+
+                if path == '/app':
+                    return self.send_app('home')
+                if path.startswith('/app/reports/'):
+                    return self.send_app(path.rsplit('/', 1)[-1])
+                if path.startswith('/app/frame/'):
+                    return self.send_frame(path.rsplit('/', 1)[-1])
+                if path == '/api/report':
+                    query = parse_qs(url.query)
+                    name, file_url = portal.build_report(
+                        query.get('kind', ['sales'])[0], query.get('unit', [''])[0],
+                        query.get('from', [''])[0], query.get('to', [''])[0]
+                    )
+                    return self.send_body(json.dumps({'name': name, 'url': file_url}).encode(),
+                                          'application/json')
+                if path.startswith('/files/'):
+                    return self.send_file(path[len('/files/'):])
+                self.send_body(b'Not found', 'text/plain', 404)
+
+            def do_POST(self):
+                if portal.latency:
+                    time.sleep(portal.latency)
+                length = int(self.headers.get('Content-Length', 0))
+                self.rfile.read(length)
+                if urlparse(self.path).path != '/auth':
+                    return self.send_body(b'Not found', 'text/plain', 404)
+                token = portal.new_session()
+                self.redirect('/app', {'Set-Cookie': f"{SESSION_COOKIE}={token}; Path=/"})
+
+            def send_app(self, route: str):
+                page = APP_PAGE.replace('__ROUTE__', route)
+                self.send_body(page.encode())
+
+            def send_frame(self, route: str):
+                if route == 'home':
+                    fecha = portal.report_date.strftime('%d-%m-%Y')
+                    ultima = datetime.now().strftime('%d-%m-%Y %H:%M')
+                    page = HOME_FRAME.replace('__FECHA__', fecha).replace('__ULTIMA__', ultima)
+                    return self.send_body(page.encode())
+                if route not in ('sales', 'inventory'):
+                    return self.send_body(b'Not found', 'text/plain', 404)
+                page = REPORT_FRAME.replace('__KIND__', route)
+                page = page.replace('__DATE_PICKERS__', DATE_PICKERS if route == 'sales' else '')
+                page = page.replace('__UNITS__', json.dumps(portal.units))
+                page = page.replace('__LATENCY_MS__', str(int(portal.latency * 1000)))
+                page = page.replace('__GENERATE_MS__', str(int(portal.generate_delay * 1000)))
+                self.send_body(page.encode())
+
+            def send_file(self, name: str):
+                with portal._lock:
+                    entry = portal.files.get(name)
+                if entry is None:
+                    return self.send_body(b'Not found', 'text/plain', 404)
+                filename, data = entry
+                content_type = 'application/zip' if filename.endswith('.zip') else 'text/csv'
+                headers = {
+                    'Content-Disposition': f'attachment; filename="{filename}"',
+                    'Accept-Ranges': 'bytes',
+                }
+                # Honour simple "bytes=N-" ranges so interrupted fetches can resume
+                range_header = self.headers.get('Range', '')
+                if range_header.startswith('bytes=') and range_header.endswith('-'):
+                    start = int(range_header[len('bytes='):-1] or 0)
+                    if 0 < start < len(data):
+                        headers['Content-Range'] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+                        return self.send_body(data[start:], content_type, 206, headers)
+                self.send_body(data, content_type, 200, headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the FEMSA B2B portal")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--units', type=int, default=1, help="Business units in the report dropdown")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds per response and UI round-trip")
+    parser.add_argument('--generate-delay', type=float, default=0.5, help="Seconds to generate a report")
+    parser.add_argument('--rows', type=int, default=1000, help="Rows per generated report")
+    parser.add_argument('--session-ttl', type=float, default=None, help="Seconds before sessions expire")
+    args = parser.parse_args()
+
+    portal = MockPortal(args.host, args.port, args.units, args.latency, args.generate_delay,
+                        args.rows, args.session_ttl)
+    print(f"Mock portal listening on {portal.base_url} (set FEMSA_BASE_URL to use it)")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portal.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
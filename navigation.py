@@ -0,0 +1,48 @@
+"""Report routes learned from the portal menu, for direct navigation on later visits"""
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+MENU_ITEM = ".bbr-menu-item:nth-child({}) > .bbr-menu-item__link"
+
+
+class MenuStep(NamedTuple):
+    selector: str
+    description: str
+
+
+# Menu items clicked after opening .btn-menu-header, per report type
+REPORT_MENUS: Dict[str, Tuple[MenuStep, ...]] = {
+    'ventas': (
+        MenuStep(MENU_ITEM.format(4), 'reports menu'),
+        MenuStep(MENU_ITEM.format(1), 'sales report'),
+    ),
+    'inventario': (
+        MenuStep(MENU_ITEM.format(2), 'inventory report'),
+    ),
+}
+
+
+class RouteCache:
+    """
+    URL each report page ends up on after its menu traversal, per portal.
+    Shared by every run in the process so only the first client of a batch
+    walks the menu.
+    """
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, report_type: str) -> Optional[str]:
+        with self._lock:
+            return self._routes.get((base_url, report_type))
+
+    def learn(self, base_url: str, report_type: str, url: str):
+        with self._lock:
+            self._routes[(base_url, report_type)] = url
+
+    def forget(self, base_url: str, report_type: str):
+        with self._lock:
+            self._routes.pop((base_url, report_type), None)
+
+
+ROUTES = RouteCache()
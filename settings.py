@@ -0,0 +1,54 @@
+"""Runtime settings for the FEMSA automation, overridable through environment variables"""
+import os
+
+# Database connection used by every entry point
+DB_CONFIG = {
+    'host': os.environ.get('FEMSA_DB_HOST', 'localhost'),
+    'user': os.environ.get('FEMSA_DB_USER', 'b2b_user'),
+    'password': os.environ.get('FEMSA_DB_PASSWORD', 'OPjp%6kiyEfX'),
+    'database': os.environ.get('FEMSA_DB_NAME', 'python'),
+}
+
+# Portal to automate; point it at mock_portal.py for local runs and benchmarks
+BASE_URL = os.environ.get('FEMSA_BASE_URL', 'https://femsab2b.bbr.cl')
+
+# Root directory for downloaded and extracted client files
+DATA_DIR = os.environ.get('FEMSA_DATA_DIR', '/home/b2b_pharmatender/archivos_csv/carga')
+
+# Number of concurrent browser workers used by the batch runner
+BATCH_WORKERS = int(os.environ.get('FEMSA_BATCH_WORKERS', '4'))
+
+# chromedriver resolution; a pinned path skips webdriver_manager entirely
+CHROMEDRIVER_PATH = os.environ.get('FEMSA_CHROMEDRIVER_PATH') or None
+CHROME_BINARY = os.environ.get('FEMSA_CHROME_BINARY') or None
+DRIVER_MANIFEST = os.environ.get(
+    'FEMSA_DRIVER_MANIFEST',
+    os.path.join(os.path.expanduser('~'), '.cache', 'femsa_rpa', 'chromedriver_manifest.json')
+)
+
+# Wait engine: 'event' waits on readiness, 'sleep' keeps the fixed sleeps,
+# 'calibrate' keeps the fixed sleeps and logs how long each one really needed
+WAIT_MODE = os.environ.get('FEMSA_WAIT_MODE', 'event')
+WAIT_MIN = float(os.environ.get('FEMSA_WAIT_MIN', '0.2'))
+WAIT_MAX = float(os.environ.get('FEMSA_WAIT_MAX', '30'))
+
+# Seconds to wait for a report file to finish downloading
+DOWNLOAD_TIMEOUT = float(os.environ.get('FEMSA_DOWNLOAD_TIMEOUT', '180'))
+
+# How report files are downloaded: 'watcher' (click, then directory events),
+# 'cdp' (click, then DevTools download events, needs Chrome performance
+# logging) or 'http' (fetch the link directly with the session cookies)
+DOWNLOAD_MODE = os.environ.get('FEMSA_DOWNLOAD_MODE', 'watcher')
+
+# Run the inventory pipeline in a second browser session alongside sales
+PARALLEL_PIPELINES = os.environ.get('FEMSA_PARALLEL_PIPELINES', '0') == '1'
+
+# Browser sessions per client that business units are spread over; with
+# PARALLEL_PIPELINES each pipeline still gets at least one session
+UNIT_CONCURRENCY = int(os.environ.get('FEMSA_UNIT_CONCURRENCY', '1'))
+
+# Directory for per-run step timing spans (newline-delimited JSON); empty disables
+SPANS_DIR = os.environ.get('FEMSA_SPANS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'spans'))
+
+# Directory for Chrome trace-event timelines of each run; empty disables them
+TRACE_DIR = os.environ.get('FEMSA_TRACE_DIR', '')
@@ -0,0 +1,134 @@
+"""Per-step timing spans written as newline-delimited JSON"""
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import settings
+
+
+class SpanRecorder:
+    """
+    Record start, end, duration and outcome of named steps. Spans nest per
+    thread, and each finished span is appended as one JSON line to the run's
+    file. A recorder without a path keeps spans in memory only.
+    """
+    def __init__(self, path: Optional[str] = None, **context: Any):
+        self.path = path
+        self.context = context
+        self.spans: List[Dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, 'a', buffering=1)
+
+    @classmethod
+    def for_run(cls, cliente: str) -> 'SpanRecorder':
+        """Create the recorder for one client run, honouring FEMSA_SPANS_DIR"""
+        path = None
+        if settings.SPANS_DIR:
+            filename = f"{cliente}_{time.strftime('%Y%m%d_%H%M%S')}.ndjson"
+            path = os.path.join(settings.SPANS_DIR, filename)
+        return cls(path, client=cliente)
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self, skip: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+        """The innermost open span on the calling thread whose name does not start with a `skip` prefix"""
+        for record in reversed(self._stack()):
+            if not record['name'].startswith(skip):
+                return record
+        return None
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """Time the enclosed block; the yielded dict can be enriched with attributes"""
+        stack = self._stack()
+        record: Dict[str, Any] = {
+            'span_id': next(self._ids),
+            'parent_id': stack[-1]['span_id'] if stack else None,
+            'name': name,
+            **self.context,
+            **{key: value for key, value in attrs.items() if value is not None},
+            'thread': threading.current_thread().name,
+            'start': time.time(),
+        }
+        stack.append(record)
+        try:
+            yield record
+            record['outcome'] = 'ok'
+        except BaseException as e:
+            record['outcome'] = 'error'
+            record['error'] = str(e)
+            raise
+        finally:
+            stack.pop()
+            record['end'] = time.time()
+            record['duration'] = record['end'] - record['start']
+            self._emit(record)
+
+    def _emit(self, record: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(record)
+            if self._file:
+                self._file.write(json.dumps(record, default=str) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+_active = threading.local()
+
+
+def activate(recorder: Optional[SpanRecorder]):
+    """Make `recorder` receive spans from shared code (e.g. DB calls) on this thread"""
+    _active.recorder = recorder
+
+
+def active_recorder() -> Optional[SpanRecorder]:
+    return getattr(_active, 'recorder', None)
+
+
+@contextmanager
+def maybe_span(name: str, **attrs: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """Record a span on the thread's active recorder, or do nothing without one"""
+    recorder = active_recorder()
+    if recorder is None:
+        yield None
+        return
+    with recorder.span(name, **attrs) as record:
+        yield record
+
+
+def traced(name: str):
+    """
+    Record a span around an FEMSAAutomation method. `iteration` (or `index`)
+    and `report_type` are taken from the call arguments when given, otherwise
+    from the automation's current step.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            iteration = arguments.get('iteration', arguments.get('index', self.current_iteration))
+            report_type = arguments.get('report_type', self.current_report_type)
+            with self.spans.span(name, report_type=report_type, iteration=iteration):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,57 @@
+"""Export recorded spans in the Chrome trace-event format (chrome://tracing, Perfetto)"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import settings
+
+# Span fields that are shown as slice arguments in the trace viewer
+ARG_FIELDS = ('client', 'report_type', 'iteration', 'outcome', 'outcome_detail', 'error', 'sql', 'legacy_seconds')
+
+
+def spans_to_trace_events(spans: Iterable[Dict[str, Any]], pid: int = 1,
+                          process_name: str = 'femsa') -> List[Dict[str, Any]]:
+    """Convert finished spans to complete ('X') events, one track per thread"""
+    spans = sorted(spans, key=lambda span: span['start'])
+    if not spans:
+        return []
+    origin = spans[0]['start']
+    thread_ids: Dict[str, int] = {}
+    events: List[Dict[str, Any]] = [
+        {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': process_name}},
+    ]
+    for span in spans:
+        thread = span.get('thread', 'main')
+        if thread not in thread_ids:
+            thread_ids[thread] = len(thread_ids) + 1
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                           'tid': thread_ids[thread], 'args': {'name': thread}})
+        events.append({
+            'name': span['name'],
+            'cat': span['name'].split('.')[0],
+            'ph': 'X',
+            'ts': round((span['start'] - origin) * 1e6),
+            'dur': round(span['duration'] * 1e6),
+            'pid': pid,
+            'tid': thread_ids[thread],
+            'args': {field: span[field] for field in ARG_FIELDS if span.get(field) is not None},
+        })
+    return events
+
+
+def write_trace(path: str, events: List[Dict[str, Any]]):
+    """Write trace events as a JSON object loadable by chrome://tracing"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    print(f"Trace written to {path}")
+
+
+def write_run_trace(spans: Iterable[Dict[str, Any]], name: str) -> Optional[str]:
+    """Write the trace of one run to FEMSA_TRACE_DIR, if trace export is enabled"""
+    if not settings.TRACE_DIR:
+        return None
+    path = os.path.join(settings.TRACE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.trace.json")
+    write_trace(path, spans_to_trace_events(spans, process_name=name))
+    return path
@@ -0,0 +1,132 @@
+"""Readiness probes for the Vaadin Flow application behind the portal"""
+from typing import Any, Dict, List
+
+from selenium.common.exceptions import WebDriverException
+
+# Returns true while any Flow client still has a UIDL request in flight or the
+# loading indicator is showing, false when idle and null on non-Vaadin pages
+VAADIN_BUSY_SCRIPT = """
+var vaadin = window.Vaadin;
+if (!vaadin || !vaadin.Flow || !vaadin.Flow.clients) {
+    return null;
+}
+var clients = vaadin.Flow.clients;
+for (var id in clients) {
+    var client = clients[id];
+    if (client && typeof client.isActive === 'function' && client.isActive()) {
+        return true;
+    }
+}
+var indicator = document.querySelector('.v-loading-indicator');
+if (indicator && window.getComputedStyle(indicator).display !== 'none') {
+    return true;
+}
+return false;
+"""
+
+# Reads every rendered vaadin-item of an opened select as plain label/value
+# pairs (property first, attribute as fallback, like WebElement.get_attribute),
+# then clicks the select (arguments[0]) to close its overlay again
+SELECT_OPTIONS_SCRIPT = """
+var read = function (item, name) {
+    var value = item[name];
+    return value !== undefined && value !== null ? String(value) : item.getAttribute(name);
+};
+var options = [];
+document.querySelectorAll('vaadin-item').forEach(function (item) {
+    options.push({label: read(item, 'label'), value: read(item, 'value')});
+});
+if (arguments[0]) {
+    arguments[0].click();
+}
+return options;
+"""
+
+# Clicks the rendered vaadin-item whose value (property or attribute) is arguments[0]
+SELECT_ITEM_SCRIPT = """
+var items = document.querySelectorAll('vaadin-item');
+for (var i = 0; i < items.length; i++) {
+    var value = items[i].value;
+    if (value === undefined || value === null) {
+        value = items[i].getAttribute('value');
+    }
+    if (String(value) === arguments[0]) {
+        items[i].click();
+        return true;
+    }
+}
+return false;
+"""
+
+
+# Async script: sets the pickers matched by arguments[0] to the values in
+# arguments[1], fires value-changed on each and resolves once Vaadin is idle
+# again (or arguments[2] seconds passed) with the values the pickers now hold
+SET_PICKERS_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var pickers = document.querySelectorAll(arguments[0]);
+var values = arguments[1];
+var deadline = Date.now() + arguments[2] * 1000;
+var busy = function () {
+""" + VAADIN_BUSY_SCRIPT + """
+};
+if (pickers.length < values.length) {
+    done({values: [], idle: true, error: 'found ' + pickers.length + ' date pickers'});
+    return;
+}
+for (var i = 0; i < values.length; i++) {
+    pickers[i].value = values[i];
+    pickers[i].dispatchEvent(new CustomEvent('value-changed', {
+        detail: {value: values[i]},
+        bubbles: true,
+        composed: true
+    }));
+}
+var poll = function () {
+    var idle = busy() !== true;
+    if (idle || Date.now() > deadline) {
+        var current = [];
+        for (var j = 0; j < values.length; j++) {
+            current.push(pickers[j].value);
+        }
+        done({values: current, idle: idle, error: null});
+        return;
+    }
+    setTimeout(poll, 50);
+};
+// Give the change listeners a tick to queue their server round-trip
+setTimeout(poll, 50);
+"""
+
+
+def vaadin_busy(driver) -> bool:
+    """Ask the current browsing context whether Vaadin is waiting on the server"""
+    return driver.execute_script(VAADIN_BUSY_SCRIPT) is True
+
+
+class vaadin_idle:
+    """
+    Expected condition that holds once no Vaadin client in the current
+    browsing context is waiting on a server round-trip. Pages that are not
+    Vaadin Flow count as idle.
+    """
+    def __call__(self, driver):
+        try:
+            return not vaadin_busy(driver)
+        except WebDriverException:
+            return False
+
+
+def set_pickers(driver, selector: str, values: List[str], timeout: float) -> Dict[str, Any]:
+    """Set several date pickers and read them back after the round-trip, in one call"""
+    return driver.execute_async_script(SET_PICKERS_SCRIPT, selector, values, timeout)
+
+
+def select_options(driver, select_element=None) -> List[Dict[str, str]]:
+    """Label/value table of an opened select in one round-trip, closing it when given"""
+    return driver.execute_script(SELECT_OPTIONS_SCRIPT, select_element) or []
+
+
+def select_item(driver, value: str) -> bool:
+    """Click the opened select's item carrying `value`; false when it is not rendered"""
+    return driver.execute_script(SELECT_ITEM_SCRIPT, value) is True
@@ -0,0 +1,163 @@
+"""Readiness-based waits that replace the fixed sleeps of the automation flow"""
+import time
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
+
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+from selenium.webdriver.common.by import By
+
+from spans import SpanRecorder
+import settings
+
+Condition = Callable[[Any], Any]
+
+WAIT_MODES = ('event', 'sleep', 'calibrate')
+
+# Vaadin overlays that sit on top of the page while a popup is open
+OVERLAY_SELECTOR = ', '.join(
+    f"{tag}[opened]" for tag in (
+        'vaadin-select-overlay',
+        'vaadin-combo-box-overlay',
+        'vaadin-date-picker-overlay',
+        'vaadin-context-menu-overlay',
+        'vaadin-menu-bar-overlay',
+    )
+)
+
+
+def element_ready(locator: Tuple[str, str]) -> Condition:
+    """Element is attached, displayed and enabled"""
+    def condition(driver):
+        elements = driver.find_elements(*locator)
+        return bool(elements) and elements[0].is_displayed() and elements[0].is_enabled()
+    return condition
+
+
+def element_present(locator: Tuple[str, str]) -> Condition:
+    """Element is attached to the DOM"""
+    def condition(driver):
+        return bool(driver.find_elements(*locator))
+    return condition
+
+
+def link_hrefs(driver, locator: Tuple[str, str]) -> Set[str]:
+    """The hrefs of every link currently matching `locator`"""
+    return {element.get_attribute('href') for element in driver.find_elements(*locator)}
+
+
+def new_link(locator: Tuple[str, str], seen: Set[str]) -> Condition:
+    """A link matching `locator` whose href is not in `seen`; returns that link"""
+    def condition(driver):
+        for element in driver.find_elements(*locator):
+            if element.get_attribute('href') not in seen:
+                return element
+        return False
+    return condition
+
+
+def replaced(element, locator: Tuple[str, str]) -> Condition:
+    """`element` went stale or `locator` now matches a different element first"""
+    def condition(driver):
+        try:
+            element.is_enabled()
+        except StaleElementReferenceException:
+            return True
+        found = driver.find_elements(*locator)
+        return bool(found) and found[0] != element
+    return condition
+
+
+def frame_navigated(url: str, frame_src: Optional[str]) -> Condition:
+    """The top document's URL or its first iframe's src moved away from the given values"""
+    def condition(driver):
+        if driver.current_url != url:
+            return True
+        frames = driver.find_elements(By.TAG_NAME, "iframe")
+        return bool(frames) and frames[0].get_attribute('src') != frame_src
+    return condition
+
+
+def overlay_closed() -> Condition:
+    """No Vaadin popup overlay is open"""
+    def condition(driver):
+        return driver.execute_script(
+            "return document.querySelector(arguments[0]) === null;", OVERLAY_SELECTOR
+        )
+    return condition
+
+
+def document_ready() -> Condition:
+    """The current document finished loading"""
+    def condition(driver):
+        return driver.execute_script("return document.readyState;") == 'complete'
+    return condition
+
+
+class WaitEngine:
+    def __init__(self, driver, mode: str = settings.WAIT_MODE,
+                 min_wait: float = settings.WAIT_MIN, max_wait: float = settings.WAIT_MAX,
+                 poll_interval: float = 0.1, spans: Optional[SpanRecorder] = None):
+        if mode not in WAIT_MODES:
+            raise ValueError(f"Unknown wait mode {mode!r}, expected one of {WAIT_MODES}")
+        self.driver = driver
+        self.mode = mode
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.calibration: List[Dict[str, Any]] = []
+        self.spans = spans
+
+    def _ready(self, conditions: Tuple[Condition, ...]) -> bool:
+        try:
+            return all(condition(self.driver) for condition in conditions)
+        except WebDriverException:
+            return False
+
+    def settle(self, label: str, legacy_seconds: float, *conditions: Condition,
+               max_wait: Optional[float] = None) -> float:
+        """
+        Wait where the flow used to call time.sleep(legacy_seconds)
+
+        Args:
+            label: Name of the wait, used in calibration output
+            legacy_seconds: Duration of the fixed sleep this call replaces
+            conditions: Readiness checks that must all hold before continuing
+            max_wait: Upper bound for this wait, defaults to the engine maximum
+
+        Returns:
+            Seconds actually waited
+        """
+        if self.spans is None:
+            return self._settle(label, legacy_seconds, conditions, max_wait)
+        with self.spans.span(f"wait.{label}", legacy_seconds=legacy_seconds):
+            return self._settle(label, legacy_seconds, conditions, max_wait)
+
+    def _settle(self, label: str, legacy_seconds: float, conditions: Tuple[Condition, ...],
+                max_wait: Optional[float]) -> float:
+        started = time.time()
+        if self.mode == 'sleep':
+            time.sleep(legacy_seconds)
+            return time.time() - started
+
+        limit = self.max_wait if max_wait is None else max_wait
+        ready_after = None
+        while True:
+            elapsed = time.time() - started
+            if ready_after is None and elapsed >= self.min_wait and self._ready(conditions):
+                ready_after = elapsed
+                if self.mode == 'event':
+                    return elapsed
+            if self.mode == 'calibrate' and elapsed >= legacy_seconds:
+                break
+            if self.mode == 'event' and elapsed >= limit:
+                print(f"Wait '{label}' gave up after {elapsed:.1f}s without reaching readiness")
+                return elapsed
+            time.sleep(self.poll_interval)
+
+        # Calibrate mode: keep the original sleep but report when the page was actually ready
+        waited = time.time() - started
+        self.calibration.append({'label': label, 'legacy': legacy_seconds, 'ready_after': ready_after})
+        if ready_after is None:
+            print(f"[calibrate] {label}: slept {legacy_seconds}s, conditions never held")
+        else:
+            print(f"[calibrate] {label}: slept {legacy_seconds}s, ready after {ready_after:.2f}s")
+        return waited